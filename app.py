@@ -3,20 +3,36 @@ Comprehensive Liver Disease Risk Assessment System
 Supports: Cirrhosis, HCC, and NAFLD risk prediction
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, send_file, make_response
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, g
+from flask.json.provider import JSONProvider
 import os
+# Single-row inference is latency-bound: one BLAS/OpenMP thread per process,
+# with parallelism coming from gunicorn workers. Set before numpy/xgboost load.
+for _thread_var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+    os.environ.setdefault(_thread_var, '1')
 import sys
 import re
 import json
-import tempfile
+import logging
+import string
+import orjson
+import threading
+import time
 import traceback
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from math import log, sqrt
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import httpx
 from typing import Dict, Any
 import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
 import openai
 import markdown
-from bs4 import BeautifulSoup
 from google.genai import Client
 from io import BytesIO
 from reportlab.lib.pagesizes import A4
@@ -25,24 +41,80 @@ from reportlab.lib.units import mm
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    # Numba is optional - fall back to plain Python functions
+    NUMBA_AVAILABLE = False
+    prange = range
+    
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 # Load environment variables
 load_dotenv()
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
+logger = logging.getLogger(__name__)
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (used by jsonify, request.get_json and the session)"""
+    sort_keys = True
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, option=option).decode()
+    
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        # orjson has no hooks; the session serializer passes object_hook to untag
+        # tuples, markup etc., so those calls go through the stdlib decoder
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'dev_secret_key')
 
 # Configure Google AI Client
 genai_client = Client(api_key=os.environ.get('GOOGLE_AI_API_KEY'))
 
+# Shared OpenRouter client (OpenAI SDK) - keeps TLS connections alive across requests
+openrouter_client = openai.OpenAI(
+    api_key=os.environ.get('OPENROUTER_API_KEY'),
+    base_url='https://openrouter.ai/api/v1',
+    http_client=httpx.Client(limits=httpx.Limits(max_keepalive_connections=32))
+)
+
+# Shared HTTP session for direct API calls
+http_session = requests.Session()
+http_session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=64,
+                                           max_retries=Retry(total=2, backoff_factor=0.2)))
+
+# Prompt templates are read once at startup
+with open('PROMPT', 'r', encoding='utf-8') as f:
+    _PROMPT_TEMPLATE = string.Template(f.read())
+with open('DOCUMENT_OCR_PROMPT', 'r', encoding='utf-8') as f:
+    _OCR_PROMPT = f.read()
+
 # Import database and authentication utilities
 from database import db
 from auth_utils import validate_email, validate_password, get_medical_fields, get_medical_fields_for_language
 
 # Import i18n manager
 from i18n import i18n
-from medical_system_prompt import MEDICAL_SYSTEM_PROMPT
-print(MEDICAL_SYSTEM_PROMPT)
-print(type(MEDICAL_SYSTEM_PROMPT))
+from medical_system_prompt import get_system_prompt, render_role_suffix
 i18n.init_app(app)
+i18n.on_reload(get_medical_fields_for_language.cache_clear)
+
+@app.before_request
+def set_request_language():
+    """Resolve the session language once per request"""
+    g.lang = i18n.get_current_language()
 
 # Flask-Login setup
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
@@ -75,24 +147,75 @@ def load_user(user_id):
 # Add the models directory to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
 
-from models.cirrhosis_model import predict_cirrhosis_risk
-from models.hcc_model_final import predict_hcc_risk
-from models.nafld_model import predict_nafld_classification
+@lru_cache(maxsize=1)
+def _load_predictors():
+    """Import the disease models on first use so workers that never predict skip loading them"""
+    from models.cirrhosis_model import predict_cirrhosis_risk
+    from models.hcc_model_final import predict_hcc_risk
+    from models.nafld_model import predict_nafld_classification
+    return predict_cirrhosis_risk, predict_hcc_risk, predict_nafld_classification
+
+# Form fields converted to float before scoring
+_NUMERIC_FIELDS = frozenset({
+    'age', 'gender', 'bmi', 'obesity', 'ast', 'alt', 'alp', 'ggt', 'trombosit', 'albumin', 'inr',
+    'total_bilirubin', 'direct_bilirubin', 'total_bil', 'dir_bil', 'creatinine', 'afp',
+    'encephalopathy', 'ascites'
+})
+
+# Form fields passed to each disease model (AFP is optional for HCC)
+_CIRRHOSIS_FEATS = ('age', 'gender', 'ast', 'alt', 'trombosit', 'albumin', 'bmi', 'inr',
+                    'total_bilirubin', 'creatinine', 'direct_bilirubin', 'alp')
+_HCC_FEATS = ('age', 'gender', 'ast', 'alt', 'albumin', 'creatinine', 'inr', 'trombosit',
+              'total_bilirubin', 'direct_bilirubin', 'obesity', 'alp', 'afp')
+_NAFLD_FEATS = ('age', 'gender', 'ast', 'alt', 'trombosit', 'albumin', 'bmi', 'inr',
+                'total_bilirubin', 'creatinine', 'direct_bilirubin', 'alp')
+
+# Shared pool for running the three disease models side by side
+model_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='model')
+
+# Custom display names for specific models
+_MODEL_NAME_MAP = {
+    'claude-3-haiku': 'Claude 3 Haiku',
+    'gpt-4o': 'GPT-4o',
+    'gemini-flash-1.5': 'Gemini 1.5 Flash',
+}
 
 def format_model_name(model_path: str) -> str:
     """Format model names properly for display"""
-    model_name = model_path.split('/')[-1]
-    
-    # Custom formatting for specific models
-    if model_name == 'claude-3-haiku':
-        return 'Claude 3 Haiku'
-    elif model_name == 'gpt-4o':
-        return 'GPT-4o'
-    elif model_name == 'gemini-flash-1.5':
-        return 'Gemini 1.5 Flash'
-    else:
-        # Generic fallback - replace hyphens with spaces and title case
-        return model_name.replace('-', ' ').title()
+    model_name = model_path.rsplit('/', 1)[-1]
+    
+    # Generic fallback - replace hyphens with spaces and title case
+    return _MODEL_NAME_MAP.get(model_name) or model_name.replace('-', ' ').title()
+
+def _compute_scores_vec(age: np.ndarray, ast: np.ndarray, alt: np.ndarray, plts: np.ndarray,
+                        bil: np.ndarray, inr: np.ndarray, creat: np.ndarray):
+    """
+    Calculate FIB-4, APRI and MELD for a batch of patients in one pass
+
+    Args:
+        age, ast, alt, plts, bil, inr, creat: (N,) float arrays, NaN for missing values
+        (platelets in x10^3/μL)
+
+    Returns:
+        Tuple of (fib4, apri, meld) arrays, NaN where inputs are missing or not > 0
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fib4_valid = (age > 0) & (ast > 0) & (alt > 0) & (plts > 0)
+        fib4 = np.where(fib4_valid, age * ast / (plts * np.sqrt(alt)), np.nan)
+
+        # AST/ULN (assuming ULN = 40 for AST)
+        apri_valid = (ast > 0) & (plts > 0)
+        apri = np.where(apri_valid, (ast / 40.0) / plts * 100, np.nan)
+
+        # Ensure minimum values for logarithm (MELD formula requirement)
+        meld_valid = (bil > 0) & (inr > 0) & (creat > 0)
+        meld = np.where(meld_valid,
+                        3.78 * np.log(np.maximum(bil, 1.0)) +
+                        11.2 * np.log(np.maximum(inr, 1.0)) +
+                        9.57 * np.log(np.maximum(creat, 1.0)) + 6.43,
+                        np.nan)
+
+    return fib4, apri, meld
 
 def calculate_traditional_scores(patient_data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -112,16 +235,18 @@ def calculate_traditional_scores(patient_data: Dict[str, Any]) -> Dict[str, Any]
         ast = patient_data.get('ast') 
         alt = patient_data.get('alt')
         platelets_raw = patient_data.get('trombosit')  # This should be in x10^3/μL
-        albumin = patient_data.get('albumin')
         total_bil = patient_data.get('total_bilirubin')
         inr = patient_data.get('inr')
         creatinine = patient_data.get('creatinine')
         bmi = patient_data.get('bmi')
         
+        # Single patient: plain math functions avoid NumPy scalar dispatch
+        # (batches should go through _compute_scores_vec instead)
+        
         # FIB-4 Score - only calculate if all required parameters are present
         if all(x is not None and x > 0 for x in [age, ast, alt, platelets_raw]):
             # platelets_raw is already in x10^3/μL, so we use it directly for FIB-4
-            scores['FIB-4'] = (age * ast) / (platelets_raw * np.sqrt(alt))
+            scores['FIB-4'] = (age * ast) / (platelets_raw * sqrt(alt))
         else:
             scores['FIB-4'] = 'Missing Data'
         
@@ -139,9 +264,9 @@ def calculate_traditional_scores(patient_data: Dict[str, Any]) -> Dict[str, Any]
             safe_inr = max(inr, 1.0)
             safe_creat = max(creatinine, 1.0)
             
-            scores['MELD'] = (3.78 * np.log(safe_bil) + 
-                             11.2 * np.log(safe_inr) + 
-                             9.57 * np.log(safe_creat) + 6.43)
+            scores['MELD'] = (3.78 * log(safe_bil) + 
+                             11.2 * log(safe_inr) + 
+                             9.57 * log(safe_creat) + 6.43)
         else:
             scores['MELD'] = 'Missing Data'
         
@@ -169,109 +294,256 @@ def calculate_traditional_scores(patient_data: Dict[str, Any]) -> Dict[str, Any]
     
     return scores
 
-def get_score_interpretation(score_name: str, score_value: Any) -> Dict[str, str]:
+# Child-Pugh cutpoints: albumin (g/dL), bilirubin (mg/dL), INR and total score class bounds
+_ALB_CUTS = (2.8, 3.5)
+_BIL_CUTS = (2.0, 3.0)
+_INR_CUTS = (1.7, 2.3)
+_CLASS_CUTS = (6, 9)
+
+@njit('int64(float64, float64, float64, int64, int64)', cache=True)
+def _child_pugh_total(albumin, bilirubin, inr, ascites, encephalopathy):
+    """Sum the five Child-Pugh component points (compiled natively when Numba is available)"""
+    # Each component is 3 points minus one per cutpoint passed, so no branches are taken.
+    # Albumin: > 3.5 -> 1, 2.8-3.5 -> 2, < 2.8 -> 3
+    alb_score = 3 - (albumin >= _ALB_CUTS[0]) - (albumin > _ALB_CUTS[1])
+    # Bilirubin: < 2 -> 1, 2-3 -> 2, > 3 -> 3
+    bil_score = 3 - (bilirubin < _BIL_CUTS[0]) - (bilirubin <= _BIL_CUTS[1])
+    # INR: < 1.7 -> 1, 1.7-2.3 -> 2, > 2.3 -> 3
+    inr_score = 3 - (inr < _INR_CUTS[0]) - (inr <= _INR_CUTS[1])
+    
+    # Ascites (0: none, 1: mild, 2: severe/moderate)
+    # Encephalopathy (0: none, 1: grade 1-2, 2: grade 3-4)
+    return alb_score + bil_score + inr_score + (ascites + 1) + (encephalopathy + 1)
+
+def calculate_child_pugh(albumin: float, bilirubin: float, inr: float,
+                         ascites: int, encephalopathy: int) -> Dict[str, Any]:
+    """Calculate Child-Pugh score and class"""
+    total = int(_child_pugh_total(float(albumin), float(bilirubin), float(inr),
+                                  int(ascites), int(encephalopathy)))
+    
+    # Child-Pugh Class determination: <= 6 -> A, 7-9 -> B, >= 10 -> C
+    c_class = 'ABC'[(total > _CLASS_CUTS[0]) + (total > _CLASS_CUTS[1])]
+    
+    return {'score': total, 'class': c_class}
+
+# BMI category cutpoints (kg/m²) and labels for np.digitize
+_BMI_CUTS = np.array([18.5, 25.0, 30.0])
+_BMI_LABELS = np.array(['Underweight', 'Normal', 'Overweight', 'Obese'], dtype=object)
+
+# Batches at least this large use the multi-threaded Child-Pugh kernel
+_PARALLEL_MIN_ROWS = 10_000
+
+def _child_pugh_loop(albumin, bilirubin, inr, ascites, encephalopathy):
+    """Per-patient Child-Pugh totals (NaN where any input is missing or not > 0)"""
+    n = albumin.shape[0]
+    totals = np.empty(n, dtype=np.float64)
+    for i in prange(n):
+        if (albumin[i] > 0 and bilirubin[i] > 0 and inr[i] > 0
+                and not np.isnan(ascites[i]) and not np.isnan(encephalopathy[i])):
+            totals[i] = _child_pugh_total(albumin[i], bilirubin[i], inr[i],
+                                          int(ascites[i]), int(encephalopathy[i]))
+        else:
+            totals[i] = np.nan
+    return totals
+
+_child_pugh_arr = njit(cache=True)(_child_pugh_loop)
+_child_pugh_arr_parallel = njit(parallel=True, cache=True)(_child_pugh_loop)
+
+def _child_pugh_vec(albumin: np.ndarray, bilirubin: np.ndarray, inr: np.ndarray,
+                    ascites: np.ndarray, encephalopathy: np.ndarray) -> np.ndarray:
+    """Child-Pugh totals for a batch of patients, NaN where any input is missing or not > 0"""
+    if NUMBA_AVAILABLE:
+        kernel = _child_pugh_arr_parallel if len(albumin) >= _PARALLEL_MIN_ROWS else _child_pugh_arr
+        return kernel(albumin, bilirubin, inr, ascites, encephalopathy)
+    
+    # Without Numba, whole-array NumPy operations beat a Python loop
+    alb_score = 3 - (albumin >= _ALB_CUTS[0]) - (albumin > _ALB_CUTS[1])
+    bil_score = 3 - (bilirubin < _BIL_CUTS[0]) - (bilirubin <= _BIL_CUTS[1])
+    inr_score = 3 - (inr < _INR_CUTS[0]) - (inr <= _INR_CUTS[1])
+    total = alb_score + bil_score + inr_score + (ascites + 1) + (encephalopathy + 1)
+    
+    valid = (albumin > 0) & (bilirubin > 0) & (inr > 0) & ~np.isnan(ascites) & ~np.isnan(encephalopathy)
+    return np.where(valid, total, np.nan)
+
+def calculate_traditional_scores_batch(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calculate traditional clinical scores for a batch of patients
+    
+    Args:
+        df: One row per patient, columns named like the form fields (lowercase keys)
+        
+    Returns:
+        DataFrame with FIB-4, APRI, MELD, BMI Category and, when the albumin/ascites/
+        encephalopathy columns are present, Child-Pugh Score and Class. Missing values are NaN/None.
+    """
+    def column(name):
+        if name not in df:
+            return np.full(len(df), np.nan)
+        return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+    
+    bil, inr = column('total_bilirubin'), column('inr')
+    fib4, apri, meld = _compute_scores_vec(column('age'), column('ast'), column('alt'), column('trombosit'),
+                                           bil, inr, column('creatinine'))
+    
+    bmi = column('bmi')
+    bmi_category = np.where(bmi > 0, _BMI_LABELS[np.digitize(np.nan_to_num(bmi), _BMI_CUTS)], None)
+    
+    scores = pd.DataFrame({'FIB-4': fib4, 'APRI': apri, 'MELD': meld, 'BMI Category': bmi_category},
+                          index=df.index)
+    
+    if all(name in df for name in ('albumin', 'ascites', 'encephalopathy')):
+        with np.errstate(invalid='ignore'):
+            child_pugh = _child_pugh_vec(column('albumin'), bil, inr, column('ascites'), column('encephalopathy'))
+        has_score = ~np.isnan(child_pugh)
+        scores['Child-Pugh Score'] = child_pugh
+        class_index = (np.nan_to_num(child_pugh) > _CLASS_CUTS[0]).astype(int) + (np.nan_to_num(child_pugh) > _CLASS_CUTS[1])
+        scores['Child-Pugh Class'] = np.where(has_score, np.array(['A', 'B', 'C'], dtype=object)[class_index], None)
+    
+    return scores
+
+class _ResultsBundle(dict):
+    """Translations under ``results`` with the same key-path fallback as ``i18n.t``"""
+    def __missing__(self, key):
+        return f'results.{key}'
+
+def _get_results_bundle() -> Dict[str, Any]:
+    """Get the ``results`` translations for the current language, built once per request"""
+    language = i18n.get_current_language()
+    cached = g.get('results_bundle')
+    if cached is None or cached[0] != language:
+        bundle = _ResultsBundle(i18n.translations.get(i18n.default_language, {}).get('results', {}))
+        bundle.update(i18n.translations.get(language, {}).get('results', {}))
+        cached = (language, bundle)
+        g.results_bundle = cached
+    return cached[1]
+
+def _is_number(value: Any) -> bool:
+    """Check whether a score holds a numeric value rather than a status string"""
+    return isinstance(value, (int, float))
+
+def _inclusive(bound: float) -> float:
+    """Nudge a `<=` bucket bound up one ulp so searchsorted(side='right') keeps it in the lower bucket"""
+    return float(np.nextafter(bound, np.inf))
+
+# Numeric score buckets: (upper bounds, colors, level keys, interpretation keys)
+_SCORE_TABLE = {
+    'FIB-4': (
+        np.array([1.30, _inclusive(2.67)]),
+        ('success', 'warning', 'danger'),
+        ('low', 'intermediate', 'high'),
+        ('lowProbabilityAdvancedFibrosis', 'intermediateProbability', 'highProbabilityAdvancedFibrosis'),
+    ),
+    'APRI': (
+        np.array([0.5, _inclusive(1.5)]),
+        ('success', 'warning', 'danger'),
+        ('low', 'intermediate', 'high'),
+        ('lowProbabilitySignificantFibrosis', 'intermediateProbability', 'highProbabilitySignificantFibrosis'),
+    ),
+    'MELD': (
+        np.array([10.0, _inclusive(15.0), _inclusive(20.0)]),
+        ('success', 'warning', 'warning', 'danger'),
+        ('low', 'moderate', 'high', 'veryHigh'),
+        ('lowMortalityRisk', 'moderateMortalityRisk', 'highMortalityRisk', 'veryHighMortalityRisk'),
+    ),
+}
+
+def get_score_interpretation(score_name: str, score_value: Any, bundle: Dict[str, Any] = None) -> Dict[str, str]:
     """
     Get color and interpretation for traditional clinical scores
     
     Args:
         score_name: Name of the score
         score_value: Value of the score
+        bundle: Results translation bundle (defaults to the current request's bundle)
         
     Returns:
         Dictionary with color, interpretation, and level
     """
+    if bundle is None:
+        bundle = _get_results_bundle()
+    
     # Handle missing or invalid data
     if score_value == 'Missing Data':
-        return {'color': 'secondary', 'level': i18n.t('results.missing'), 'interpretation': 'Required parameters not provided'}
+        return {'color': 'secondary', 'level': bundle['missing'], 'interpretation': 'Required parameters not provided'}
     elif score_value == 'Invalid Data':
-        return {'color': 'secondary', 'level': i18n.t('results.invalid'), 'interpretation': 'Invalid parameter values'}
+        return {'color': 'secondary', 'level': bundle['invalid'], 'interpretation': 'Invalid parameter values'}
     elif score_value is None or (isinstance(score_value, str) and score_value.strip() == ''):
-        return {'color': 'secondary', 'level': i18n.t('results.unknown'), 'interpretation': i18n.t('results.unableToCalculate')}
-    
-    if score_name == 'FIB-4':
-        if isinstance(score_value, (int, float)):
-            if score_value < 1.30:
-                return {'color': 'success', 'level': i18n.t('results.low'), 'interpretation': i18n.t('results.lowProbabilityAdvancedFibrosis')}
-            elif score_value <= 2.67:
-                return {'color': 'warning', 'level': i18n.t('results.intermediate'), 'interpretation': i18n.t('results.intermediateProbability')}
-            else:
-                return {'color': 'danger', 'level': i18n.t('results.high'), 'interpretation': i18n.t('results.highProbabilityAdvancedFibrosis')}
-        else:
-            return {'color': 'secondary', 'level': i18n.t('results.invalid'), 'interpretation': i18n.t('results.unableToCalculate')}
-    
-    elif score_name == 'APRI':
-        if isinstance(score_value, (int, float)):
-            if score_value < 0.5:
-                return {'color': 'success', 'level': i18n.t('results.low'), 'interpretation': i18n.t('results.lowProbabilitySignificantFibrosis')}
-            elif score_value <= 1.5:
-                return {'color': 'warning', 'level': i18n.t('results.intermediate'), 'interpretation': i18n.t('results.intermediateProbability')}
-            else:
-                return {'color': 'danger', 'level': i18n.t('results.high'), 'interpretation': i18n.t('results.highProbabilitySignificantFibrosis')}
-        else:
-            return {'color': 'secondary', 'level': i18n.t('results.invalid'), 'interpretation': i18n.t('results.unableToCalculate')}
+        return {'color': 'secondary', 'level': bundle['unknown'], 'interpretation': bundle['unableToCalculate']}
     
-    elif score_name == 'MELD':
-        if isinstance(score_value, (int, float)):
-            if score_value < 10:
-                return {'color': 'success', 'level': i18n.t('results.low'), 'interpretation': i18n.t('results.lowMortalityRisk')}
-            elif score_value <= 15:
-                return {'color': 'warning', 'level': i18n.t('results.moderate'), 'interpretation': i18n.t('results.moderateMortalityRisk')}
-            elif score_value <= 20:
-                return {'color': 'warning', 'level': i18n.t('results.high'), 'interpretation': i18n.t('results.highMortalityRisk')}
-            else:
-                return {'color': 'danger', 'level': i18n.t('results.veryHigh'), 'interpretation': i18n.t('results.veryHighMortalityRisk')}
+    if score_name in _SCORE_TABLE:
+        if _is_number(score_value):
+            bounds, colors, levels, interpretations = _SCORE_TABLE[score_name]
+            bucket = int(np.searchsorted(bounds, score_value, side='right'))
+            return {'color': colors[bucket], 'level': bundle[levels[bucket]], 'interpretation': bundle[interpretations[bucket]]}
         else:
-            return {'color': 'secondary', 'level': i18n.t('results.invalid'), 'interpretation': i18n.t('results.unableToCalculate')}
+            return {'color': 'secondary', 'level': bundle['invalid'], 'interpretation': bundle['unableToCalculate']}
     
     elif score_name == 'Child-Pugh Score':
-        if isinstance(score_value, (int, float)):
+        if _is_number(score_value):
             if score_value <= 6:
-                return {'color': 'success', 'level': 'Class A', 'interpretation': i18n.t('results.childPughA')}
+                return {'color': 'success', 'level': 'Class A', 'interpretation': bundle['childPughA']}
             elif score_value <= 9:
-                return {'color': 'warning', 'level': 'Class B', 'interpretation': i18n.t('results.childPughB')}
+                return {'color': 'warning', 'level': 'Class B', 'interpretation': bundle['childPughB']}
             elif score_value <= 15:
-                return {'color': 'danger', 'level': 'Class C', 'interpretation': i18n.t('results.childPughC')}
+                return {'color': 'danger', 'level': 'Class C', 'interpretation': bundle['childPughC']}
             else:
-                return {'color': 'danger', 'level': i18n.t('results.severe'), 'interpretation': i18n.t('results.criticalLiverFunction')}
+                return {'color': 'danger', 'level': bundle['severe'], 'interpretation': bundle['criticalLiverFunction']}
         else:
-            return {'color': 'secondary', 'level': i18n.t('results.invalid'), 'interpretation': i18n.t('results.unableToCalculate')}
+            return {'color': 'secondary', 'level': bundle['invalid'], 'interpretation': bundle['unableToCalculate']}
     
     elif score_name == 'Child-Pugh Class':
         if score_value == 'A':
-            return {'color': 'success', 'level': 'Class A', 'interpretation': i18n.t('results.childPughA')}
+            return {'color': 'success', 'level': 'Class A', 'interpretation': bundle['childPughA']}
         elif score_value == 'B':
-            return {'color': 'warning', 'level': 'Class B', 'interpretation': i18n.t('results.childPughB')}
+            return {'color': 'warning', 'level': 'Class B', 'interpretation': bundle['childPughB']}
         elif score_value == 'C':
-            return {'color': 'danger', 'level': 'Class C', 'interpretation': i18n.t('results.childPughC')}
+            return {'color': 'danger', 'level': 'Class C', 'interpretation': bundle['childPughC']}
         else:
-            return {'color': 'secondary', 'level': i18n.t('results.unknown'), 'interpretation': i18n.t('results.unableToCalculate')}
+            return {'color': 'secondary', 'level': bundle['unknown'], 'interpretation': bundle['unableToCalculate']}
     
     elif score_name == 'BMI Category':
         if score_value == 'Underweight':
-            return {'color': 'info', 'level': i18n.t('results.underweight'), 'interpretation': i18n.t('results.belowNormalWeight')}
+            return {'color': 'info', 'level': bundle['underweight'], 'interpretation': bundle['belowNormalWeight']}
         elif score_value == 'Normal':
-            return {'color': 'success', 'level': i18n.t('results.normal'), 'interpretation': i18n.t('results.healthyWeight')}
+            return {'color': 'success', 'level': bundle['normal'], 'interpretation': bundle['healthyWeight']}
         elif score_value == 'Overweight':
-            return {'color': 'warning', 'level': i18n.t('results.overweight'), 'interpretation': i18n.t('results.aboveNormalWeight')}
+            return {'color': 'warning', 'level': bundle['overweight'], 'interpretation': bundle['aboveNormalWeight']}
         elif score_value == 'Obese':
-            return {'color': 'danger', 'level': i18n.t('results.obese'), 'interpretation': i18n.t('results.significantlyAboveNormalWeight')}
+            return {'color': 'danger', 'level': bundle['obese'], 'interpretation': bundle['significantlyAboveNormalWeight']}
         else:
-            return {'color': 'secondary', 'level': i18n.t('results.unknown'), 'interpretation': i18n.t('results.unableToDetermineBMI')}
+            return {'color': 'secondary', 'level': bundle['unknown'], 'interpretation': bundle['unableToDetermineBMI']}
     
     else:
-        return {'color': 'secondary', 'level': i18n.t('results.unknown'), 'interpretation': i18n.t('results.noInterpretationAvailable')}
+        return {'color': 'secondary', 'level': bundle['unknown'], 'interpretation': bundle['noInterpretationAvailable']}
+
+def build_score_rows(traditional_scores: Dict[str, Any], score_interpretations: Dict[str, Dict[str, str]]) -> list:
+    """Flatten scores and their interpretations into (name, value, color, level, interpretation) rows"""
+    rows = []
+    for score_name, score_value in traditional_scores.items():
+        interp = score_interpretations[score_name]
+        rows.append((score_name, score_value, interp['color'], interp['level'], interp['interpretation']))
+    return rows
+
+def _to_jsonable(obj: Any) -> Any:
+    """Convert nested results (including numpy scalars/arrays) to plain JSON types"""
+    return orjson.loads(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS))
+
+def _format_kv(data: Dict[str, Any]) -> str:
+    """Format a mapping as 'key: value' lines for the AI prompt"""
+    return '\n'.join(f"{k}: {v}" for k, v in data.items())
 
 def translate_risk_levels(results):
     """Translate hardcoded risk levels in model results to current language"""
+    bundle = _get_results_bundle()
     translation_map = {
-        'Low': i18n.t('results.low'),
-        'Moderate': i18n.t('results.moderate'), 
-        'High': i18n.t('results.high'),
-        'Intermediate': i18n.t('results.intermediate'),
-        'Very High': i18n.t('results.veryHigh'),
-        'Unknown': i18n.t('results.unknown'),
-        'Invalid': i18n.t('results.invalid'),
-        'Error': i18n.t('results.error')
+        'Low': bundle['low'],
+        'Moderate': bundle['moderate'], 
+        'High': bundle['high'],
+        'Intermediate': bundle['intermediate'],
+        'Very High': bundle['veryHigh'],
+        'Unknown': bundle['unknown'],
+        'Invalid': bundle['invalid'],
+        'Error': bundle['error']
     }
     
     # Process each disease result
@@ -315,6 +587,7 @@ def login():
     
     return render_template('login.html')
 
+@lru_cache(maxsize=16)
 def get_doctor_titles_for_language(language='en'):
     """Get doctor titles with translations for the current language"""
     
@@ -341,6 +614,8 @@ def get_doctor_titles_for_language(language='en'):
     else:
         return [(title, title) for title in base_titles]
 
+i18n.on_reload(get_doctor_titles_for_language.cache_clear)
+
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     """Registration page for medical professionals"""
@@ -397,7 +672,7 @@ def register():
         if errors:
             for error in errors:
                 flash(error, 'error')
-            return render_template('register.html', medical_fields=get_medical_fields_for_language(i18n.get_current_language()), doctor_titles=get_doctor_titles_for_language(i18n.get_current_language()), form_data=form_data)
+            return render_template('register.html', medical_fields=get_medical_fields_for_language(g.lang), doctor_titles=get_doctor_titles_for_language(g.lang), form_data=form_data)
         
         # Create user
         try:
@@ -417,9 +692,9 @@ def register():
             return redirect(url_for('login'))
         except Exception as e:
             flash(i18n.t('auth.registrationFailed', error=str(e)), 'error')
-            return render_template('register.html', medical_fields=get_medical_fields_for_language(i18n.get_current_language()), doctor_titles=get_doctor_titles_for_language(i18n.get_current_language()), form_data=form_data)
+            return render_template('register.html', medical_fields=get_medical_fields_for_language(g.lang), doctor_titles=get_doctor_titles_for_language(g.lang), form_data=form_data)
     
-    return render_template('register.html', medical_fields=get_medical_fields_for_language(i18n.get_current_language()), doctor_titles=get_doctor_titles_for_language(i18n.get_current_language()))
+    return render_template('register.html', medical_fields=get_medical_fields_for_language(g.lang), doctor_titles=get_doctor_titles_for_language(g.lang))
 
 @app.route('/logout')
 @login_required
@@ -454,10 +729,7 @@ def set_language(language):
 @app.route('/api/translations')
 def get_translations():
     """API endpoint to get current translations (for client-side if needed)"""
-    return jsonify({
-        'translations': i18n.get_all_translations(),
-        'language_info': i18n.get_language_info()
-    })
+    return app.response_class(i18n.get_translations_payload(), mimetype='application/json')
 
 @app.route('/')
 @login_required
@@ -477,51 +749,32 @@ def calculate_risks():
         # Common fields mapping
         patient_data = {}
         
-        # Extract and convert form data
+        # Extract and convert form data (keys normalized once so downstream lowercase lookups hit)
         for key, value in form_data.items():
             if value and value.strip():
+                key = key.strip().lower()
                 try:
                     # Convert to float if it's a numeric field
-                    if key in ['age', 'Age', 'ast', 'AST', 'alt', 'ALT', 'trombosit', 'Trombosit', 
-                              'albumin', 'Albumin', 'bmi', 'BMI', 'inr', 'INR', 'total_bilirubin', 
-                              'Total_Bilirubin', 'creatinine', 'Creatinine', 'direct_bilirubin', 
-                              'Direct_Bilirubin', 'alp', 'ALP', 'afp', 'AFP', 'gender', 'Gender', 
-                              'obesity', 'Obesity', 'Total_Bil', 'Dir_Bil', 'ggt', 'encephalopathy', 'ascites']:
-                        patient_data[key] = float(value)
-                    else:
-                        patient_data[key] = value
+                    patient_data[key] = float(value) if key in _NUMERIC_FIELDS else value
                 except ValueError:
                     # If conversion fails, keep as string
                     patient_data[key] = value
         
-        # Prepare data for Cirrhosis model
-        cirrhosis_data = {}
-        for field in ['age', 'gender', 'ast', 'alt', 'trombosit', 'albumin', 'bmi', 'inr', 'total_bilirubin', 'creatinine', 'direct_bilirubin', 'alp']:
-            if field in patient_data:
-                cirrhosis_data[field] = patient_data[field]
-        
-        # Prepare data for HCC model
-        hcc_data = {}
-        for field in ['age', 'gender', 'ast', 'alt', 'albumin', 'creatinine', 'inr', 'trombosit', 'total_bilirubin', 'direct_bilirubin', 'obesity', 'alp']:
-            if field in patient_data:
-                hcc_data[field] = patient_data[field]
-        
-        # Add AFP if provided (optional field)
-        if 'afp' in patient_data:
-            hcc_data['afp'] = patient_data['afp']
-        
-        # Prepare data for NAFLD model
-        nafld_data = {}
-        for field in ['age', 'gender', 'ast', 'alt', 'trombosit', 'albumin', 'bmi', 'inr', 'total_bilirubin', 'creatinine', 'direct_bilirubin', 'alp']:
-            if field in patient_data:
-                nafld_data[field] = patient_data[field]
-        
-        # Calculate risks for all diseases
+        # Prepare data for each disease model
+        cirrhosis_data = {field: patient_data[field] for field in _CIRRHOSIS_FEATS if field in patient_data}
+        hcc_data = {field: patient_data[field] for field in _HCC_FEATS if field in patient_data}
+        nafld_data = {field: patient_data[field] for field in _NAFLD_FEATS if field in patient_data}
+        
+        # Calculate risks for all diseases - the three models run concurrently
+        predict_cirrhosis_risk, predict_hcc_risk, predict_nafld_classification = _load_predictors()
         results = {}
+        cirrhosis_future = model_executor.submit(predict_cirrhosis_risk, cirrhosis_data)
+        hcc_future = model_executor.submit(predict_hcc_risk, hcc_data)
+        nafld_future = model_executor.submit(predict_nafld_classification, nafld_data)
         
         # Cirrhosis risk
         try:
-            cirrhosis_result = predict_cirrhosis_risk(cirrhosis_data)
+            cirrhosis_result = cirrhosis_future.result()
             results['cirrhosis'] = cirrhosis_result
         except Exception as e:
             results['cirrhosis'] = {
@@ -533,7 +786,7 @@ def calculate_risks():
         
         # HCC risk
         try:
-            hcc_result = predict_hcc_risk(hcc_data)
+            hcc_result = hcc_future.result()
             results['hcc'] = hcc_result
         except Exception as e:
             results['hcc'] = {
@@ -545,7 +798,7 @@ def calculate_risks():
         
         # NAFLD risk
         try:
-            nafld_result = predict_nafld_classification(nafld_data)
+            nafld_result = nafld_future.result()
             results['nafld'] = nafld_result
         except Exception as e:
             results['nafld'] = {
@@ -561,50 +814,6 @@ def calculate_risks():
         # Translate risk levels in results
         results = translate_risk_levels(results)
         
-        # Child-Pugh Score calculation
-        def calculate_child_pugh(albumin, bilirubin, inr, ascites, encephalopathy):
-            # Albumin (g/dL) - Standard Child-Pugh criteria
-            if albumin > 3.5:
-                alb_score = 1
-            elif 2.8 <= albumin <= 3.5:
-                alb_score = 2
-            else:  # < 2.8
-                alb_score = 3
-                
-            # Bilirubin (mg/dL) - Standard Child-Pugh criteria
-            if bilirubin < 2:
-                bil_score = 1
-            elif 2 <= bilirubin <= 3:
-                bil_score = 2
-            else:  # > 3
-                bil_score = 3
-                
-            # INR - Standard Child-Pugh criteria
-            if inr < 1.7:
-                inr_score = 1
-            elif 1.7 <= inr <= 2.3:  # Fixed: was 2.2, should be 2.3
-                inr_score = 2
-            else:  # > 2.3
-                inr_score = 3
-                
-            # Ascites (0: none, 1: mild, 2: severe/moderate)
-            ascites_score = int(ascites) + 1
-            
-            # Encephalopathy (0: none, 1: grade 1-2, 2: grade 3-4)
-            enceph_score = int(encephalopathy) + 1
-            
-            total = alb_score + bil_score + inr_score + ascites_score + enceph_score
-            
-            # Child-Pugh Class determination
-            if total <= 6:
-                c_class = 'A'
-            elif 7 <= total <= 9:
-                c_class = 'B'
-            else:  # >= 10
-                c_class = 'C'
-                
-            return {'score': total, 'class': c_class}
-        
         # Extract parameters for Child-Pugh calculation
         def safe_int(val):
             try:
@@ -657,34 +866,24 @@ def calculate_risks():
             child_pugh = {'score': 0, 'class': 'Unknown'}
         
         # Get score interpretations AFTER adding Child-Pugh scores
+        results_bundle = _get_results_bundle()
         score_interpretations = {}
         for score_name, score_value in traditional_scores.items():
-            score_interpretations[score_name] = get_score_interpretation(score_name, score_value)
+            score_interpretations[score_name] = get_score_interpretation(score_name, score_value, results_bundle)
         
         # Store patient data and results in session for later use (AI doctor assessment)
         # Convert to JSON-serializable format
-        def make_serializable(obj):
-            if isinstance(obj, dict):
-                return {k: make_serializable(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [make_serializable(item) for item in obj]
-            elif hasattr(obj, 'item'):  # numpy scalar
-                return obj.item()
-            elif hasattr(obj, 'tolist'):  # numpy array
-                return obj.tolist()
-            else:
-                return obj
-        
-        session['patient_data'] = make_serializable(patient_data)
-        session['results'] = make_serializable(results)
-        session['traditional_scores'] = make_serializable(traditional_scores)
-        session['score_interpretations'] = make_serializable(score_interpretations)
+        session['patient_data'] = _to_jsonable(patient_data)
+        session['results'] = _to_jsonable(results)
+        session['traditional_scores'] = _to_jsonable(traditional_scores)
+        session['score_interpretations'] = _to_jsonable(score_interpretations)
         
         return render_template('results.html', 
                              results=results, 
                              patient_data=patient_data,
                              traditional_scores=traditional_scores,
                              score_interpretations=score_interpretations,
+                             score_rows=build_score_rows(traditional_scores, score_interpretations),
                              has_afp='afp' in patient_data and patient_data['afp'],
                              child_pugh=child_pugh)
     except Exception as e:
@@ -700,49 +899,6 @@ def calculate_risks():
                 except (ValueError, TypeError):
                     return 0
             
-            def calculate_child_pugh(albumin, bilirubin, inr, ascites, encephalopathy):
-                # Albumin (g/dL) - Standard Child-Pugh criteria
-                if albumin > 3.5:
-                    alb_score = 1
-                elif 2.8 <= albumin <= 3.5:
-                    alb_score = 2
-                else:  # < 2.8
-                    alb_score = 3
-                    
-                # Bilirubin (mg/dL) - Standard Child-Pugh criteria
-                if bilirubin < 2:
-                    bil_score = 1
-                elif 2 <= bilirubin <= 3:
-                    bil_score = 2
-                else:  # > 3
-                    bil_score = 3
-                    
-                # INR - Standard Child-Pugh criteria
-                if inr < 1.7:
-                    inr_score = 1
-                elif 1.7 <= inr <= 2.3:  # Fixed: was 2.2, should be 2.3
-                    inr_score = 2
-                else:  # > 2.3
-                    inr_score = 3
-                    
-                # Ascites (0: none, 1: mild, 2: severe/moderate)
-                ascites_score = int(ascites) + 1
-                
-                # Encephalopathy (0: none, 1: grade 1-2, 2: grade 3-4)
-                enceph_score = int(encephalopathy) + 1
-                
-                total = alb_score + bil_score + inr_score + ascites_score + enceph_score
-                
-                # Child-Pugh Class determination
-                if total <= 6:
-                    c_class = 'A'
-                elif 7 <= total <= 9:
-                    c_class = 'B'
-                else:  # >= 10
-                    c_class = 'C'
-                    
-                return {'score': total, 'class': c_class}
-            
             try:
                 # Validate required parameters - DO NOT default to medically dangerous values
                 required_params = ['albumin', 'total_bilirubin', 'inr', 'ascites', 'encephalopathy']
@@ -791,9 +947,10 @@ def calculate_risks():
                     traditional_scores = {}
                 traditional_scores['Child-Pugh Score'] = 0
                 traditional_scores['Child-Pugh Class'] = 'Unknown'
+            results_bundle = _get_results_bundle()
             score_interpretations = {}
             for score_name, score_value in traditional_scores.items():
-                score_interpretations[score_name] = get_score_interpretation(score_name, score_value)
+                score_interpretations[score_name] = get_score_interpretation(score_name, score_value, results_bundle)
         except:
             traditional_scores = {}
             score_interpretations = {}
@@ -803,7 +960,8 @@ def calculate_risks():
                              results={},
                              patient_data=patient_data,
                              traditional_scores=traditional_scores,
-                             score_interpretations=score_interpretations)
+                             score_interpretations=score_interpretations,
+                             score_rows=build_score_rows(traditional_scores, score_interpretations))
 
 @app.route('/api/calculate_risks', methods=['POST'])
 @login_required
@@ -811,68 +969,89 @@ def api_calculate_risks():
     """API endpoint for risk calculation"""
     try:
         data = request.get_json()
-        
-        # Process similar to above but return JSON
-        results = {}
+        predict_cirrhosis_risk, predict_hcc_risk, predict_nafld_classification = _load_predictors()
+        
+        # Read each field once; the three models use different key spellings
+        age = data.get('age', 0)
+        gender = data.get('gender', 0)
+        ast = data.get('ast', 0)
+        alt = data.get('alt', 0)
+        trombosit = data.get('trombosit', 0)
+        albumin = data.get('albumin', 0)
+        bmi = data.get('bmi', 0)
+        inr = data.get('inr', 0)
+        total_bilirubin = data.get('total_bilirubin', 0)
+        creatinine = data.get('creatinine', 0)
+        direct_bilirubin = data.get('direct_bilirubin', 0)
+        alp = data.get('alp', 0)
         
         # Cirrhosis risk
         cirrhosis_data = {
-            'Age': data.get('age', 0),
-            'Gender': data.get('gender', 0),
-            'AST': data.get('ast', 0),
-            'ALT': data.get('alt', 0),
-            'Trombosit': data.get('trombosit', 0),
-            'Albumin': data.get('albumin', 0),
-            'BMI': data.get('bmi', 0),
-            'INR': data.get('inr', 0),
-            'Total_Bilirubin': data.get('total_bilirubin', 0),
-            'Creatinine': data.get('creatinine', 0),
-            'Direct_Bilirubin': data.get('direct_bilirubin', 0),
-            'ALP': data.get('alp', 0)
+            'Age': age, 'Gender': gender, 'AST': ast, 'ALT': alt, 'Trombosit': trombosit,
+            'Albumin': albumin, 'BMI': bmi, 'INR': inr, 'Total_Bilirubin': total_bilirubin,
+            'Creatinine': creatinine, 'Direct_Bilirubin': direct_bilirubin, 'ALP': alp
         }
-        results['cirrhosis'] = predict_cirrhosis_risk(cirrhosis_data)
         
         # HCC risk
         hcc_data = {
-            'Age': data.get('age', 0),
-            'Gender': data.get('gender', 0) - 1,
-            'AST': data.get('ast', 0),
-            'ALT': data.get('alt', 0),
-            'Albumin': data.get('albumin', 0),
-            'Creatinine': data.get('creatinine', 0),
-            'INR': data.get('inr', 0),
-            'Trombosit': data.get('trombosit', 0),
-            'Total_Bil': data.get('total_bilirubin', 0),
-            'Dir_Bil': data.get('direct_bilirubin', 0),
-            'Obesity': data.get('obesity', 0),
-            'ALP': data.get('alp', 0)
+            'Age': age, 'Gender': gender - 1, 'AST': ast, 'ALT': alt, 'Albumin': albumin,
+            'Creatinine': creatinine, 'INR': inr, 'Trombosit': trombosit, 'Total_Bil': total_bilirubin,
+            'Dir_Bil': direct_bilirubin, 'Obesity': data.get('obesity', 0), 'ALP': alp
         }
-        if 'afp' in data and data['afp']:
+        if data.get('afp'):
             hcc_data['AFP'] = data['afp']
-        results['hcc'] = predict_hcc_risk(hcc_data)
         
         # NAFLD risk
         nafld_data = {
-            'age': data.get('age', 0),
-            'gender': data.get('gender', 0),
-            'AST': data.get('ast', 0),
-            'ALT': data.get('alt', 0),
-            'trombosit': data.get('trombosit', 0),
-            'albumin': data.get('albumin', 0),
-            'bmi': data.get('bmi', 0),
-            'inr': data.get('inr', 0),
-            'total_bilirubin': data.get('total_bilirubin', 0),
-            'creatinine': data.get('creatinine', 0),
-            'direct_bilirubin': data.get('direct_bilirubin', 0),
-            'ALP': data.get('alp', 0)
+            'age': age, 'gender': gender, 'AST': ast, 'ALT': alt, 'trombosit': trombosit,
+            'albumin': albumin, 'bmi': bmi, 'inr': inr, 'total_bilirubin': total_bilirubin,
+            'creatinine': creatinine, 'direct_bilirubin': direct_bilirubin, 'ALP': alp
+        }
+        
+        # Run the three models side by side
+        cirrhosis_future = model_executor.submit(predict_cirrhosis_risk, cirrhosis_data)
+        hcc_future = model_executor.submit(predict_hcc_risk, hcc_data)
+        nafld_future = model_executor.submit(predict_nafld_classification, nafld_data)
+        results = {
+            'cirrhosis': cirrhosis_future.result(),
+            'hcc': hcc_future.result(),
+            'nafld': nafld_future.result()
         }
-        results['nafld'] = predict_nafld_classification(nafld_data)
         
         return jsonify(results)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/calculate_risks_batch', methods=['POST'])
+@login_required
+def api_calculate_risks_batch():
+    """API endpoint for traditional score calculation over a list of patients"""
+    try:
+        data = request.get_json()
+        patients = data.get('patients', []) if isinstance(data, dict) else data
+        if not isinstance(patients, list) or not patients:
+            return jsonify({'error': 'Expected a non-empty list of patients'}), 400
+        
+        df = pd.DataFrame.from_records(patients)
+        df.columns = [str(col).strip().lower() for col in df.columns]
+        scores = calculate_traditional_scores_batch(df)
+        
+        return jsonify({'traditional_scores': scores.to_dict('records')})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Role-based prompts for the chatbot
+_ROLE_PROMPTS = MappingProxyType({
+    'Uzman Doktor': "Sen bir tıp uzmanısın. Cevapların kısa ve teknik olmalı.",
+    'Asistan': "Sen bir asistan doktorsun. Cevapların orta düzey açıklayıcı olsun.", 
+    'Öğrenci': "Sen bir öğretmensin. Cevapların detaylı ve öğretici olsun."
+})
+_ROLE_MESSAGES = MappingProxyType({
+    role: render_role_suffix(role, role_prompt) for role, role_prompt in _ROLE_PROMPTS.items()
+})
+
 @app.route('/api/chat', methods=['POST'])
 def chat_endpoint():
     """
@@ -887,20 +1066,14 @@ def chat_endpoint():
         if not message.strip():
             return jsonify({'reply': 'Lütfen bir soru yazın.'}), 400
         
-        # Role-based prompts
-        role_prompts = {
-            'Uzman Doktor': "Sen bir tıp uzmanısın. Cevapların kısa ve teknik olmalı.",
-            'Asistan': "Sen bir asistan doktorsun. Cevapların orta düzey açıklayıcı olsun.", 
-            'Öğrenci': "Sen bir öğretmensin. Cevapların detaylı ve öğretici olsun."
-        }
-        
-        system_prompt = MEDICAL_SYSTEM_PROMPT.format(
-            role=role,
-            role_prompt=role_prompts.get(role, role_prompts['Öğrenci'])
-        )
+        # Role goes in its own trailing system message so the prompt's core rules
+        # stay a stable prefix across requests
+        role_message = _ROLE_MESSAGES.get(role)
+        if role_message is None:
+            role_message = render_role_suffix(role, _ROLE_PROMPTS['Öğrenci'])
         
         # Use OpenRouter API (since your OPENAI_API_KEY is actually an OpenRouter key)
-        response = requests.post(
+        response = http_session.post(
             "https://openrouter.ai/api/v1/chat/completions",
             headers={
                 "Authorization": f"Bearer {os.environ.get('OPENAI_API_KEY')}",
@@ -911,12 +1084,14 @@ def chat_endpoint():
             json={
                 "model": "openai/gpt-4o",
                 "messages": [
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": get_system_prompt(message, role)},
+                    {"role": "system", "content": role_message},
                     {"role": "user", "content": message}
                 ],
                 "max_tokens": 500,
                 "temperature": 0.7
-            }
+            },
+            timeout=(3.05, 30)
         )
         
         if response.status_code == 200:
@@ -933,76 +1108,98 @@ def chat_endpoint():
         traceback.print_exc()
         return jsonify({"reply": "Bir hata oluştu. Lütfen tekrar deneyin."}), 500
 
+# Pre-serialized health bodies; ai_model_loaded reports whether the predictors have been imported yet
+_HEALTH_BODIES = {
+    loaded: orjson.dumps({
+        'status': 'healthy',
+        'service': 'Liver Disease Risk Assessment',
+        'ai_model_loaded': loaded
+    })
+    for loaded in (False, True)
+}
+
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy', 
-        'service': 'Liver Disease Risk Assessment',
-        'ai_model_loaded': True
-    })
+    loaded = _load_predictors.cache_info().currsize > 0
+    return app.response_class(_HEALTH_BODIES[loaded], mimetype='application/json')
+
+# Sample patient data for testing
+_SAMPLE_PATIENTS = MappingProxyType({
+    'low': {
+        'name': 'Low Risk Patient - Healthy Young Adult',
+        'age': 28,
+        'gender': 1,
+        'bmi': 21.5,
+        'obesity': 0,
+        'ast': 18,
+        'alt': 22,
+        'alp': 65,
+        'trombosit': 320,
+        'albumin': 4.7,
+        'inr': 0.9,
+        'total_bilirubin': 0.5,
+        'direct_bilirubin': 0.12,
+        'creatinine': 0.7,
+        'afp': 1.8
+    },
+    'moderate': {
+        'name': 'Moderate Risk Patient - MAFLD with Fibrosis',
+        'age': 52,
+        'gender': 2,
+        'bmi': 29.2,
+        'obesity': 0,
+        'ast': 78,
+        'alt': 92,
+        'alp': 145,
+        'trombosit': 135,
+        'albumin': 3.4,
+        'inr': 1.4,
+        'total_bilirubin': 2.1,
+        'direct_bilirubin': 0.8,
+        'creatinine': 1.3,
+        'afp': 18.5
+    },
+    'high': {
+        'name': 'High Risk Patient - Advanced Liver Disease',
+        'age': 58,
+        'gender': 2,
+        'bmi': 33.8,
+        'obesity': 1,
+        'ast': 210,
+        'alt': 185,
+        'alp': 285,
+        'trombosit': 72,
+        'albumin': 2.4,
+        'inr': 2.8,
+        'total_bilirubin': 6.2,
+        'direct_bilirubin': 3.8,
+        'creatinine': 2.1,
+        'afp': 280.0
+    }
+})
+
+# Pre-serialized JSON bodies for the sample endpoint
+_SAMPLE_RESPONSES = MappingProxyType({
+    patient_id: orjson.dumps(patient, option=orjson.OPT_SORT_KEYS)
+    for patient_id, patient in _SAMPLE_PATIENTS.items()
+})
+_SAMPLE_NOT_FOUND = orjson.dumps({'error': 'Patient not found'})
 
 @app.route('/sample/<patient_id>')
 def get_sample_patient(patient_id):
     """Get sample patient data for testing"""
-    sample_patients = {
-        'low': {
-            'name': 'Low Risk Patient - Healthy Young Adult',
-            'age': 28,
-            'gender': 1,
-            'bmi': 21.5,
-            'obesity': 0,
-            'ast': 18,
-            'alt': 22,
-            'alp': 65,
-            'trombosit': 320,
-            'albumin': 4.7,
-            'inr': 0.9,
-            'total_bilirubin': 0.5,
-            'direct_bilirubin': 0.12,
-            'creatinine': 0.7,
-            'afp': 1.8
-        },
-        'moderate': {
-            'name': 'Moderate Risk Patient - MAFLD with Fibrosis',
-            'age': 52,
-            'gender': 2,
-            'bmi': 29.2,
-            'obesity': 0,
-            'ast': 78,
-            'alt': 92,
-            'alp': 145,
-            'trombosit': 135,
-            'albumin': 3.4,
-            'inr': 1.4,
-            'total_bilirubin': 2.1,
-            'direct_bilirubin': 0.8,
-            'creatinine': 1.3,
-            'afp': 18.5
-        },
-        'high': {
-            'name': 'High Risk Patient - Advanced Liver Disease',
-            'age': 58,
-            'gender': 2,
-            'bmi': 33.8,
-            'obesity': 1,
-            'ast': 210,
-            'alt': 185,
-            'alp': 285,
-            'trombosit': 72,
-            'albumin': 2.4,
-            'inr': 2.8,
-            'total_bilirubin': 6.2,
-            'direct_bilirubin': 3.8,
-            'creatinine': 2.1,
-            'afp': 280.0
-        }
-    }
-    
-    if patient_id in sample_patients:
-        return jsonify(sample_patients[patient_id])
-    else:
-        return jsonify({'error': 'Patient not found'}), 404
+    body = _SAMPLE_RESPONSES.get(patient_id)
+    if body is None:
+        return app.response_class(_SAMPLE_NOT_FOUND, status=404, mimetype='application/json')
+    return app.response_class(body, mimetype='application/json')
+
+# AI doctors for /doctor-assessment: display name and OpenRouter model
+_ASSESSMENT_DOCTORS = MappingProxyType({
+    'smith': {'name': 'Smith', 'model': 'anthropic/claude-3-haiku'},
+    'johnson': {'name': 'Johnson', 'model': 'openai/gpt-4o'},
+    'brown': {'name': 'Brown', 'model': 'google/gemini-flash-2.5'}
+})
 
 @app.route('/doctor-assessment', methods=['POST'])
 @login_required
@@ -1010,48 +1207,35 @@ def doctor_assessment():
     try:
         data = request.get_json()
         doctor = data.get('doctor', 'smith')
-        doctor_map = {
-            'smith': {'name': 'Smith', 'model': 'anthropic/claude-3-haiku'},
-            'johnson': {'name': 'Johnson', 'model': 'openai/gpt-4o'},
-            'brown': {'name': 'Brown', 'model': 'google/gemini-flash-2.5'}
-        }
-        if doctor not in doctor_map:
+        doctor_info = _ASSESSMENT_DOCTORS.get(doctor)
+        if doctor_info is None:
             return jsonify({'success': False, 'error': 'Invalid doctor selected.'})
-        doctor_info = doctor_map[doctor]
         # Retrieve patient data and results from session
         patient_data = session.get('patient_data')
         results = session.get('results')
         traditional_scores = session.get('traditional_scores')
         if not patient_data or not results or not traditional_scores:
             return jsonify({'success': False, 'error': 'Session expired or missing data. Please recalculate risks.'})
-        # Prepare prompt
-        with open('PROMPT', 'r', encoding='utf-8') as f:
-            prompt_template = f.read()
         # Format patient data for prompt
-        patient_data_str = '\n'.join([f"{k}: {v}" for k, v in patient_data.items()])
-        traditional_scores_str = '\n'.join([f"{k}: {v}" for k, v in traditional_scores.items()])
-        prompt = prompt_template.replace('{{doctor_name}}', doctor_info['name']) \
-            .replace('{{patient_inputted_data_like_gender_age_alt_ast_all_of_them}}', patient_data_str) \
-            .replace('{{predicted_cirrhosis_risk}}', str(results['cirrhosis'].get('risk_percentage', 'N/A'))) \
-            .replace('{{predicted_hcc_risk}}', str(results['hcc'].get('risk_percentage', 'N/A'))) \
-            .replace('{{predicted_nafld_risk}}', str(results['nafld'].get('risk_percentage', 'N/A'))) \
-            .replace('{{traditional_scores}}', traditional_scores_str)
-        
-        # Log the prompt to console for debugging
-        print(f"\n{'='*60}")
-        print(f"AI DOCTOR ASSESSMENT REQUEST - Doctor {doctor_info['name']}")
-        print(f"{'='*60}")
-        print(f"Model: {doctor_info['model']}")
-        print(f"Prompt:\n{prompt}")
-        print(f"{'='*60}\n")
+        patient_data_str = _format_kv(patient_data)
+        traditional_scores_str = _format_kv(traditional_scores)
+        prompt = _PROMPT_TEMPLATE.substitute(
+            doctor_name=doctor_info['name'],
+            patient_inputted_data_like_gender_age_alt_ast_all_of_them=patient_data_str,
+            predicted_cirrhosis_risk=results['cirrhosis'].get('risk_percentage', 'N/A'),
+            predicted_hcc_risk=results['hcc'].get('risk_percentage', 'N/A'),
+            predicted_nafld_risk=results['nafld'].get('risk_percentage', 'N/A'),
+            traditional_scores=traditional_scores_str,
+            lang=session.get('language', 'tr')
+        )
+        
+        # Log the prompt for debugging
+        logger.debug("AI doctor assessment request - Doctor %s, model %s\nPrompt:\n%s",
+                     doctor_info['name'], doctor_info['model'], prompt)
         
         # Call OpenRouter API using OpenAI SDK
-        client = openai.OpenAI(
-            api_key=os.environ.get('OPENROUTER_API_KEY'),
-            base_url='https://openrouter.ai/api/v1'
-        )
         model = doctor_info['model']
-        response = client.chat.completions.create(
+        response = openrouter_client.chat.completions.create(
             model=model,
             messages=[{"role": "user", "content": prompt}],
             max_tokens=800,
@@ -1060,9 +1244,7 @@ def doctor_assessment():
         assessment = response.choices[0].message.content
         
         # Log the AI response for debugging
-        print(f"AI RESPONSE from {doctor_info['name']} ({doctor_info['model']}):")
-        print(f"Response: {assessment}")
-        print(f"{'='*60}\n")
+        logger.debug("AI response from %s (%s): %s", doctor_info['name'], doctor_info['model'], assessment)
         
         return jsonify({
             'success': True,
@@ -1072,6 +1254,10 @@ def doctor_assessment():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+# Markdown code fences around OCR JSON output (```json ... ```)
+_CODE_FENCE_RE = re.compile(r'^```(?:json)?|```$', re.MULTILINE)
+_JSON_DECODER = json.JSONDecoder()
+
 @app.route('/process_document', methods=['POST'])
 @login_required
 def process_document():
@@ -1084,54 +1270,34 @@ def process_document():
         if file.filename == '':
             return jsonify({'success': False, 'error': i18n.t('errors.noFileSelected')})
         
-        # Read the OCR prompt
-        with open('DOCUMENT_OCR_PROMPT', 'r', encoding='utf-8') as f:
-            ocr_prompt = f.read()
-        
-        # Save the uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-            file.save(temp_file.name)
-            temp_file_path = temp_file.name
+        ocr_prompt = _OCR_PROMPT
         
-        try:
-            # Upload file to Google AI
-            uploaded_file = genai_client.files.upload(file=temp_file_path)
-            
-            response = genai_client.models.generate_content(
-                model='gemini-2.0-flash',
-                contents=[
-                    ocr_prompt,
-                    uploaded_file
-                ]
-            )
-        finally:
-            # Clean up temporary file
-            os.unlink(temp_file_path)
+        # Upload the file to Google AI straight from memory (no temporary file on disk)
+        uploaded_file = genai_client.files.upload(
+            file=BytesIO(file.read()),
+            config={'mime_type': file.mimetype, 'display_name': file.filename}
+        )
         
-        # Debug: Print the raw response from Gemini
-        print(f"GEMINI RAW RESPONSE:")
-        print(f"Response type: {type(response)}")
-        print(f"Response attributes: {dir(response)}")
+        response = genai_client.models.generate_content(
+            model='gemini-2.0-flash',
+            contents=[
+                ocr_prompt,
+                uploaded_file
+            ]
+        )
         
         # Get response text with better error handling
         response_text = ""
         if hasattr(response, 'text'):
             response_text = response.text
-            print(f"Response.text: '{response_text}'")
         elif hasattr(response, 'content'):
             response_text = response.content
-            print(f"Response.content: '{response_text}'")
         elif hasattr(response, 'candidates') and response.candidates:
             if hasattr(response.candidates[0], 'content'):
                 response_text = response.candidates[0].content.parts[0].text if response.candidates[0].content.parts else ""
-                print(f"Response.candidates[0].content.parts[0].text: '{response_text}'")
         else:
             response_text = str(response)
-            print(f"str(response): '{response_text}'")
-        
-        print(f"Final response_text: '{response_text}'")
-        print(f"Response length: {len(response_text)}")
-        print(f"{'='*60}\n")
+        logger.debug("Gemini OCR response (%d chars): %s", len(response_text), response_text)
         
         # Parse the JSON response with better error handling
         try:
@@ -1139,25 +1305,18 @@ def process_document():
                 raise ValueError("Empty response from Gemini")
             
             # Clean the response text - remove markdown code blocks if present
-            cleaned_text = response_text.strip()
-            if cleaned_text.startswith('```json'):
-                cleaned_text = cleaned_text.replace('```json', '').replace('```', '').strip()
-            elif cleaned_text.startswith('```'):
-                cleaned_text = cleaned_text.replace('```', '').strip()
-            
-            print(f"Cleaned response text: '{cleaned_text}'")
+            cleaned_text = _CODE_FENCE_RE.sub('', response_text.strip()).strip()
             extracted_data = json.loads(cleaned_text)
             
         except json.JSONDecodeError as e:
-            print(f"JSON Parse Error: {str(e)}")
-            print(f"Attempting to extract JSON from response...")
+            logger.debug("OCR JSON parse error, extracting embedded JSON: %s", e)
             
-            # Try to find JSON within the response
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
+            # Try to decode the first JSON object embedded in the response
+            json_start = response_text.find('{')
+            if json_start != -1:
                 try:
-                    extracted_data = json.loads(json_match.group(0))
-                    print(f"Successfully extracted JSON from response")
+                    extracted_data, _ = _JSON_DECODER.raw_decode(response_text, json_start)
+                    logger.debug("Extracted embedded JSON from OCR response")
                 except json.JSONDecodeError:
                     # Return error with the actual response for debugging
                     return jsonify({
@@ -1179,11 +1338,7 @@ def process_document():
                 })
         
         # Log the extraction for debugging
-        print(f"DOCUMENT OCR EXTRACTION SUCCESS:")
-        print(f"Extracted data: {extracted_data}")
-        print(f"Data type: {type(extracted_data)}")
-        print(f"Data keys: {list(extracted_data.keys()) if isinstance(extracted_data, dict) else 'Not a dict'}")
-        print(f"{'='*60}\n")
+        logger.debug("Document OCR extraction success: %s", extracted_data)
         
         return jsonify({
             'success': True,
@@ -1191,11 +1346,26 @@ def process_document():
         })
         
     except Exception as e:
-        print(f"OCR Error: {str(e)}")
-        print(f"Error type: {type(e)}")
-        print(f"{'='*60}\n")
+        logger.error("OCR error (%s): %s", type(e).__name__, e)
         return jsonify({'success': False, 'error': i18n.t('errors.processingError', error=str(e))})
 
+# One Markdown converter per thread; Markdown instances keep parse state and aren't thread-safe
+_markdown_local = threading.local()
+
+def _markdown_to_html(text: str) -> str:
+    """Render markdown with a reused per-thread Markdown instance"""
+    md = getattr(_markdown_local, 'md', None)
+    if md is None:
+        md = _markdown_local.md = markdown.Markdown()
+    return md.reset().convert(text)
+
+# AI doctors for /get_ai_assessment: translation key of the display name and OpenRouter model
+_DOCTOR_MAP = MappingProxyType({
+    'smith': {'name_key': 'drclaude', 'model': 'anthropic/claude-3-haiku'},
+    'johnson': {'name_key': 'drgpt', 'model': 'openai/gpt-4o'},
+    'brown': {'name_key': 'drgemini', 'model': 'google/gemini-2.5-flash'}
+})
+
 @app.route('/get_ai_assessment', methods=['POST'])
 @login_required
 def get_ai_assessment():
@@ -1217,51 +1387,43 @@ def get_ai_assessment():
                 'error': 'Session data not found. Please recalculate risks first.'
             })
     
-        doctor_map = {
-            'smith': {'name': i18n.t('drclaude'), 'model': 'anthropic/claude-3-haiku'},
-            'johnson': {'name': i18n.t('drgpt'), 'model': 'openai/gpt-4o'},
-            'brown': {'name': i18n.t('drgemini'), 'model': 'google/gemini-2.5-flash'}
-        }
-        
-        if selected_doctor not in doctor_map:
+        doctor = _DOCTOR_MAP.get(selected_doctor)
+        if doctor is None:
             return jsonify({
                 'success': False, 
                 'error': 'Invalid doctor selection.'
             })
         
-        doctor_info = doctor_map[selected_doctor]
-        
-        # Prepare prompt
-        with open('PROMPT', 'r', encoding='utf-8') as f:
-            prompt_template = f.read()
+        # Only the selected doctor's name is translated
+        doctor_info = {'name': i18n.t(doctor['name_key']), 'model': doctor['model']}
         
         # Format patient data for prompt
-        patient_data_str = '\n'.join([f"{k}: {v}" for k, v in patient_data.items()])
-        traditional_scores_str = '\n'.join([f"{k}: {v}" for k, v in traditional_scores.items()])
-        
-        prompt = prompt_template.replace('{{doctor_name}}', doctor_info['name']) \
-            .replace('{{patient_inputted_data_like_gender_age_alt_ast_all_of_them}}', patient_data_str) \
-            .replace('{{predicted_cirrhosis_risk}}', str(results['cirrhosis'].get('risk_percentage', 'N/A'))) \
-            .replace('{{predicted_hcc_risk}}', str(results['hcc'].get('risk_percentage', 'N/A'))) \
-            .replace('{{predicted_nafld_risk}}', str(results['nafld'].get('classification', 'N/A')) + f" (confidence: {results['nafld'].get('confidence', 'N/A')}%)" if results['nafld'].get('classification') else 'N/A') \
-            .replace('{{traditional_scores}}', traditional_scores_str) \
-            .replace('{{lang}}', lang)
-        
-        # Log the prompt to console for debugging
-        print(f"\n{'='*60}")
-        print(f"AI DOCTOR ASSESSMENT REQUEST - Doctor {doctor_info['name']}")
-        print(f"{'='*60}")
-        print(f"Model: {doctor_info['model']}")
-        print(f"Prompt:\n{prompt}")
-        print(f"{'='*60}\n")
+        patient_data_str = _format_kv(patient_data)
+        traditional_scores_str = _format_kv(traditional_scores)
         
-        # Call OpenRouter API using OpenAI SDK
-        client = openai.OpenAI(
-            api_key=os.environ.get('OPENROUTER_API_KEY'),
-            base_url='https://openrouter.ai/api/v1'
+        nafld = results['nafld']
+        if nafld.get('classification'):
+            nafld_risk = f"{nafld.get('classification', 'N/A')} (confidence: {nafld.get('confidence', 'N/A')}%)"
+        else:
+            nafld_risk = 'N/A'
+        
+        prompt = _PROMPT_TEMPLATE.substitute(
+            doctor_name=doctor_info['name'],
+            patient_inputted_data_like_gender_age_alt_ast_all_of_them=patient_data_str,
+            predicted_cirrhosis_risk=results['cirrhosis'].get('risk_percentage', 'N/A'),
+            predicted_hcc_risk=results['hcc'].get('risk_percentage', 'N/A'),
+            predicted_nafld_risk=nafld_risk,
+            traditional_scores=traditional_scores_str,
+            lang=lang
         )
+        
+        # Log the prompt for debugging
+        logger.debug("AI doctor assessment request - Doctor %s, model %s\nPrompt:\n%s",
+                     doctor_info['name'], doctor_info['model'], prompt)
+        
+        # Call OpenRouter API using OpenAI SDK
         model = doctor_info['model']
-        response = client.chat.completions.create(
+        response = openrouter_client.chat.completions.create(
             model=model,
             messages=[{"role": "user", "content": prompt}],
             max_tokens=800,
@@ -1271,12 +1433,10 @@ def get_ai_assessment():
         ai_assessment_title = f"{doctor_info['name']}'s ({format_model_name(doctor_info['model'])}) Assessment"
         
         # Convert markdown to HTML
-        ai_assessment = markdown.markdown(ai_assessment)
+        ai_assessment = _markdown_to_html(ai_assessment)
         
         # Log the AI response for debugging
-        print(f"AI RESPONSE from {doctor_info['name']} ({doctor_info['model']}):")
-        print(f"Response: {ai_assessment}")
-        print(f"{'='*60}\n")
+        logger.debug("AI response from %s (%s): %s", doctor_info['name'], doctor_info['model'], ai_assessment)
         
         return jsonify({
             'success': True,
@@ -1291,20 +1451,116 @@ def get_ai_assessment():
             'error': f'Error getting AI assessment: {str(e)}'
         })
 
+def register_pdf_fonts():
+    """Register Inter fonts for PDF export once per process (with Helvetica fallback)"""
+    try:
+        INTER_FONT_PATH = os.path.join(os.path.dirname(__file__), 'static', 'js', 'fonts', 'Inter-Regular.ttf')
+        INTER_BOLD_PATH = os.path.join(os.path.dirname(__file__), 'static', 'js', 'fonts', 'Inter-Bold.ttf')
+        
+        if not os.path.exists(INTER_FONT_PATH):
+            return 'Helvetica', 'Helvetica-Bold'
+        
+        pdfmetrics.registerFont(TTFont('Inter', INTER_FONT_PATH))
+        if os.path.exists(INTER_BOLD_PATH):
+            pdfmetrics.registerFont(TTFont('Inter-Bold', INTER_BOLD_PATH))
+        else:
+            # Use regular Inter for bold if bold variant not available
+            pdfmetrics.registerFont(TTFont('Inter-Bold', INTER_FONT_PATH))
+        
+        return 'Inter', 'Inter-Bold'
+    except:
+        # Fallback to Helvetica
+        return 'Helvetica', 'Helvetica-Bold'
+
+PDF_FONT_FAMILY, PDF_FONT_BOLD = register_pdf_fonts()
+
+# Gender/Obesity/Ascites/Encephalopathy mappings for the PDF tables
+_GENDER_MAP = MappingProxyType({'tr': {1: 'Erkek', 2: 'Kadın'}, 'en': {1: 'Male', 2: 'Female'}})
+_OBESITY_MAP = MappingProxyType({'tr': {0: 'Hayır', 1: 'Evet'}, 'en': {0: 'No', 1: 'Yes'}})
+_ASCITES_MAP = MappingProxyType({
+    'tr': {0: 'Yok', 1: 'Hafif', 2: 'Ağır/Refrakter'},
+    'en': {0: 'None', 1: 'Mild', 2: 'Severe/Refractory'}
+})
+_ENCEPHALOPATHY_MAP = MappingProxyType({
+    'tr': {0: 'Yok', 1: 'Hafif/Grade I-II', 2: 'Ağır/Grade III-IV'},
+    'en': {0: 'None', 1: 'Mild/Grade I-II', 2: 'Severe/Grade III-IV'}
+})
+
+# Sample used to estimate the average glyph width when truncating table cells
+_AVG_WIDTH_SAMPLE = 'abcdefghijklmnopqrstuvwxyz0123456789 '
+
+# Laboratory rows for the PDF: (label, patient key, unit, normal range)
+_LAB_FIELDS = (
+    ("AST", 'ast', 'IU/L', '5-40'),
+    ("ALT", 'alt', 'IU/L', '7-56'),
+    ("ALP", 'alp', 'IU/L', '44-147'),
+    ("Total Bilirubin", 'total_bilirubin', 'mg/dL', '0.3-1.2'),
+    ("Direct Bilirubin", 'direct_bilirubin', 'mg/dL', '0.0-0.3'),
+    ("Albumin", 'albumin', 'g/dL', '3.5-5.0'),
+    ("Platelets", 'trombosit', '×10³/μL', '150-450'),
+    ("INR", 'inr', '% (0-1)', '0.8-1.1'),
+    ("Creatinine", 'creatinine', 'mg/dL', '0.7-1.3'),
+    ("AFP", 'afp', 'ng/mL', '<10'),
+    ("GGT", 'ggt', 'IU/L', '9-48')
+)
+
+# Glyph advance widths per (font, size), each distinct character measured once per process
+_GLYPH_WIDTHS: Dict[tuple, Dict[int, float]] = {}
+
+def _glyph_width(widths: Dict[int, float], code: int, font_name: str, font_size: float) -> float:
+    width = widths.get(code)
+    if width is None:
+        width = widths[code] = pdfmetrics.stringWidth(chr(code), font_name, font_size)
+    return width
+
+def _word_widths(words: list, font_name: str, font_size: float) -> list:
+    """Widths of each word, summed from cached per-character advances in one NumPy pass"""
+    widths = _GLYPH_WIDTHS.setdefault((font_name, font_size), {})
+    codes = np.frombuffer(''.join(words).encode('utf-32-le'), dtype=np.uint32)
+    unique_codes, inverse = np.unique(codes, return_inverse=True)
+    unique_widths = np.array([_glyph_width(widths, code, font_name, font_size) for code in unique_codes.tolist()])
+    starts = np.cumsum([0] + [len(word) for word in words[:-1]])
+    return np.add.reduceat(unique_widths[inverse], starts).tolist()
+
+# Word wrapping for the PDF; cached across requests so repeated copy (e.g. the disclaimer) is measured once
+@lru_cache(maxsize=4096)
+def wrap_pdf_text(text: str, font_name: str, font_size: float, max_width: float) -> tuple:
+    """Wrap text to fit within max_width"""
+    words = text.split()
+    if not words:
+        return ()
+    lines = []
+    current_line = []
+    current_width = 0.0
+    
+    # Measure every word once and accumulate widths instead of re-measuring each prefix
+    space_width = _glyph_width(_GLYPH_WIDTHS.setdefault((font_name, font_size), {}), ord(' '), font_name, font_size)
+    for word, word_width in zip(words, _word_widths(words, font_name, font_size)):
+        added_width = word_width + space_width if current_line else word_width
+        
+        if current_width + added_width <= max_width:
+            current_line.append(word)
+            current_width += added_width
+        else:
+            if current_line:
+                lines.append(' '.join(current_line))
+                current_line = [word]
+                current_width = word_width
+            else:
+                # Word is too long, break it
+                lines.append(word)
+    
+    if current_line:
+        lines.append(' '.join(current_line))
+    
+    return tuple(lines)
+
 @app.route('/generate_pdf', methods=['POST'])
 def generate_pdf():
-    from reportlab.platypus import Table, TableStyle, Paragraph, SimpleDocTemplate, Spacer
-    from reportlab.lib import colors
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    import math
-    import re
-
     # Always use backend session data for PDF
     patient = session.get('patient_data', {})
     results = session.get('results', {})
     traditional_scores = session.get('traditional_scores', {})
-    score_interpretations = session.get('score_interpretations', {})
     lang = session.get('language', 'tr')
     i18n.set_language(lang)
     
@@ -1315,16 +1571,18 @@ def generate_pdf():
     else:
         ai_assessment = request.form.get('ai_assessment', '')
 
-    # Helper for language
+    # Helper for language; each key is resolved once per render
+    translations = {}
     def _(key, default=None):
-        try:
-            return i18n.t(key)
-        except Exception:
-            return default or key
+        if key not in translations:
+            try:
+                translations[key] = i18n.t(key)
+            except Exception:
+                translations[key] = default or key
+        return translations[key]
+    
+    unspecified = _("results.unspecified", "Belirtilmemiş")
 
-    # Gender/Obesity mapping
-    gender_map = {'tr': {1: 'Erkek', 2: 'Kadın'}, 'en': {1: 'Male', 2: 'Female'}}
-    obesity_map = {'tr': {0: 'Hayır', 1: 'Evet'}, 'en': {0: 'No', 1: 'Yes'}}
     lang_short = lang if lang in ['tr', 'en'] else 'tr'
 
     # Format patient info
@@ -1337,72 +1595,68 @@ def generate_pdf():
 
     # PDF setup
     buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
+    p = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
     width, height = A4
     margin = 40
     content_width = width - 2 * margin
     y = height - margin
 
-    # Register Inter font (with fallback)
-    try:
-        INTER_FONT_PATH = os.path.join(os.path.dirname(__file__), 'static', 'js', 'fonts', 'Inter-Regular.ttf')
-        INTER_BOLD_PATH = os.path.join(os.path.dirname(__file__), 'static', 'js', 'fonts', 'Inter-Bold.ttf')
-        
-        if os.path.exists(INTER_FONT_PATH):
-            pdfmetrics.registerFont(TTFont('Inter', INTER_FONT_PATH))
-        if os.path.exists(INTER_BOLD_PATH):
-            pdfmetrics.registerFont(TTFont('Inter-Bold', INTER_BOLD_PATH))
-        else:
-            # Use regular Inter for bold if bold variant not available
-            pdfmetrics.registerFont(TTFont('Inter-Bold', INTER_FONT_PATH))
-        
-        font_family = 'Inter'
-        font_bold = 'Inter-Bold'
-    except:
-        # Fallback to Helvetica
-        font_family = 'Helvetica'
-        font_bold = 'Helvetica-Bold'
+    font_family, font_bold = PDF_FONT_FAMILY, PDF_FONT_BOLD
+    avg_char_width = pdfmetrics.stringWidth(_AVG_WIDTH_SAMPLE, font_family, 9) / len(_AVG_WIDTH_SAMPLE)
+
+    # Last font and fill/stroke colors sent to the canvas, so unchanged state doesn't emit new operators
+    canvas_state = {}
+    set_canvas_font = p.setFont
+    set_fill_rgb = p.setFillColorRGB
+    set_stroke_rgb = p.setStrokeColorRGB
+
+    def set_font(font_name, font_size):
+        font = (font_name, font_size)
+        if canvas_state.get('font') != font:
+            set_canvas_font(font_name, font_size)
+            canvas_state['font'] = font
+
+    def set_fill_color(rgb):
+        if canvas_state.get('fill') != rgb:
+            set_fill_rgb(*rgb)
+            canvas_state['fill'] = rgb
+
+    def set_stroke_color(rgb):
+        if canvas_state.get('stroke') != rgb:
+            set_stroke_rgb(*rgb)
+            canvas_state['stroke'] = rgb
+
+    def draw_text_object(text_obj, fill_color):
+        p.drawText(text_obj)
+        # The text object's color stays in effect; its font doesn't match the canvas's own font
+        # bookkeeping, so force the next set_font to emit
+        canvas_state['fill'] = fill_color
+        canvas_state.pop('font', None)
 
     # Helper function to draw rounded rectangle
-    def draw_rounded_rect(x, y, width, height, radius, fill_color, stroke_color=None):
-        p.setFillColorRGB(*fill_color)
+    def draw_rounded_rect(x, y, width, height, radius, fill_color, stroke_color=None, inner_color=None, inner_inset=2):
+        set_fill_color(fill_color)
         if stroke_color:
-            p.setStrokeColorRGB(*stroke_color)
+            set_stroke_color(stroke_color)
         p.roundRect(x, y, width, height, radius, fill=1, stroke=1 if stroke_color else 0)
+        if inner_color:
+            # Inset fill layered on top (subtle inner shadow), no stroke
+            set_fill_color(inner_color)
+            p.roundRect(x + inner_inset, y + inner_inset, width - 2 * inner_inset, height - 2 * inner_inset,
+                        radius - inner_inset, fill=1, stroke=0)
 
     # Helper function to check if new page is needed
+    def needs_new_page(current_y, needed_space):
+        return current_y - needed_space < 60
+
     def check_new_page(current_y, needed_space):
-        if current_y - needed_space < 60:
+        if needs_new_page(current_y, needed_space):
             p.showPage()
+            # showPage resets the graphics state, including font and colors
+            canvas_state.clear()
             return height - margin
         return current_y
 
-    # Helper function for word wrapping
-    def wrap_text(text, font_name, font_size, max_width):
-        """Wrap text to fit within max_width"""
-        p.setFont(font_name, font_size)
-        words = text.split()
-        lines = []
-        current_line = []
-        
-        for word in words:
-            test_line = ' '.join(current_line + [word])
-            text_width = p.stringWidth(test_line, font_name, font_size)
-            
-            if text_width <= max_width:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-                else:
-                    # Word is too long, break it
-                    lines.append(word)
-        
-        if current_line:
-            lines.append(' '.join(current_line))
-        
-        return lines
 
     # Header with gradient-like effect
     header_height = 80
@@ -1410,21 +1664,20 @@ def generate_pdf():
                      (0.16, 0.5, 0.73), (0.12, 0.4, 0.6))
     
     # Title
-    p.setFont(font_bold, 20)
-    p.setFillColorRGB(1, 1, 1)  # White text
+    set_font(font_bold, 20)
+    set_fill_color((1, 1, 1))  # White text
     title = _("results.report_title", 'LiverAId')
     p.drawCentredString(width/2, y - 25, title)
     
     # Subtitle
-    p.setFont(font_family, 12)
-    p.setFillColorRGB(0.9, 0.9, 0.9)  # Light gray
+    set_font(font_family, 12)
+    set_fill_color((0.9, 0.9, 0.9))  # Light gray
     subtitle = _("results.report_subtitle", 'Siroz, HCC ve MAFLD için Kapsamlı Analiz')
     p.drawCentredString(width/2, y - 45, subtitle)
     
     # Date
-    p.setFont(font_family, 10)
-    from datetime import datetime
-    date_str = _("results.generated_at", 'Oluşturulma Tarihi:') + f" {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}"
+    set_font(font_family, 10)
+    date_str = _("results.generated_at", 'Oluşturulma Tarihi:') + " " + time.strftime('%d.%m.%Y %H:%M:%S')
     p.drawCentredString(width/2, y - 65, date_str)
     
     y -= header_height + 20
@@ -1435,8 +1688,8 @@ def generate_pdf():
         # Background for section header
         draw_rounded_rect(margin, y_pos - 25, content_width, 25, 5, (0.95, 0.95, 0.95))
         
-        p.setFont(font_bold, 14)
-        p.setFillColorRGB(0.2, 0.2, 0.2)
+        set_font(font_bold, 14)
+        set_fill_color((0.2, 0.2, 0.2))
         p.drawString(margin + 10, y_pos - 18, f"{title}")
         return y_pos - 35
 
@@ -1447,64 +1700,72 @@ def generate_pdf():
         row_height = 18
         table_width = sum(col_widths)
         
+        # Truncate cells to what fits their column, from the body font's average glyph width
+        max_chars = [max(3, int((col_width - 10) / avg_char_width)) for col_width in col_widths]
+        
+        # All header cells go into one text object and all body cells into another,
+        # drawn after the row backgrounds so the text stays on top
+        header_text = p.beginText()
+        header_text.setFont(font_bold, 10)
+        header_text.setFillColorRGB(1, 1, 1)  # White text for header
+        body_text = p.beginText()
+        body_text.setFont(font_family, 9)
+        body_text.setFillColorRGB(0.2, 0.2, 0.2)
+        
         for i, row in enumerate(data):
             # Row background
             if i == 0:  # Header
                 draw_rounded_rect(margin, y_pos - row_height, table_width, row_height, 3, header_bg)
-                p.setFont(font_bold, 10)
-                p.setFillColorRGB(1, 1, 1)  # White text for header
+                text_obj = header_text
             else:  # Data rows
                 if i % 2 == 0:  # Alternate row colors
                     draw_rounded_rect(margin, y_pos - row_height, table_width, row_height, 3, row_bg)
-                p.setFont(font_family, 9)
-                p.setFillColorRGB(0.2, 0.2, 0.2)
+                text_obj = body_text
             
             # Draw cells
             x = margin + 5
             for j, cell in enumerate(row):
                 cell_text = str(cell)
                 # Truncate long text
-                if len(cell_text) > 25:
-                    cell_text = cell_text[:22] + "..."
-                p.drawString(x, y_pos - 13, cell_text)
+                if len(cell_text) > max_chars[j]:
+                    cell_text = cell_text[:max_chars[j] - 3] + "..."
+                text_obj.setTextOrigin(x, y_pos - 13)
+                text_obj.textOut(cell_text)
                 x += col_widths[j]
             
             y_pos -= row_height
         
+        draw_text_object(header_text, (1, 1, 1))
+        draw_text_object(body_text, (0.2, 0.2, 0.2))
+        
         return y_pos - 10
 
     # Helper functions for ascites and encephalopathy descriptions
     def get_ascites_description(value, lang):
         """Get localized description for ascites value"""
-        ascites_map = {
-            'tr': {0: 'Yok', 1: 'Hafif', 2: 'Ağır/Refrakter'},
-            'en': {0: 'None', 1: 'Mild', 2: 'Severe/Refractory'}
-        }
         try:
-            return ascites_map[lang].get(int(value), _("results.unspecified", "Belirtilmemiş"))
+            return _ASCITES_MAP[lang].get(int(value), unspecified)
         except (ValueError, TypeError):
-            return _("results.unspecified", "Belirtilmemiş")
+            return unspecified
     
     def get_encephalopathy_description(value, lang):
         """Get localized description for encephalopathy value"""
-        encephalopathy_map = {
-            'tr': {0: 'Yok', 1: 'Hafif/Grade I-II', 2: 'Ağır/Grade III-IV'},
-            'en': {0: 'None', 1: 'Mild/Grade I-II', 2: 'Severe/Grade III-IV'}
-        }
         try:
-            return encephalopathy_map[lang].get(int(value), _("results.unspecified", "Belirtilmemiş"))
+            return _ENCEPHALOPATHY_MAP[lang].get(int(value), unspecified)
         except (ValueError, TypeError):
-            return _("results.unspecified", "Belirtilmemiş")
+            return unspecified
 
     # Patient Information Section
     y = draw_section_header(_("results.patient_info", "Hasta Bilgileri"), y)
     
+    pget = patient.get
+    age, bmi = pget('age'), pget('bmi')
     patient_info = [
         [_("results.parameter", "Parametre"), _("results.value", "Değer")],
-        [_("results.age", "Yaş"), fmt(patient.get('age', 'Belirtilmemiş')) + f" {_('results.years', 'yıl')}" if patient.get('age') else _("results.unspecified", "Belirtilmemiş")],
-        [_("results.gender", "Cinsiyet"), gender_map[lang_short].get(int(patient.get('gender', 0)), _("results.unspecified", "Belirtilmemiş"))],
-        [_("results.bmi", "BMI"), fmt(patient.get('bmi', 'Belirtilmemiş')) if patient.get('bmi') else _("results.unspecified", "Belirtilmemiş")],
-        [_("results.obesity", "Obezite"), obesity_map[lang_short].get(int(patient.get('obesity', 0)), _("results.unspecified", "Belirtilmemiş"))],
+        [_("results.age", "Yaş"), fmt(age) + f" {_('results.years', 'yıl')}" if age else unspecified],
+        [_("results.gender", "Cinsiyet"), _GENDER_MAP[lang_short].get(int(pget('gender', 0)), unspecified)],
+        [_("results.bmi", "BMI"), fmt(bmi) if bmi else unspecified],
+        [_("results.obesity", "Obezite"), _OBESITY_MAP[lang_short].get(int(pget('obesity', 0)), unspecified)],
     ]
     
     y = draw_styled_table(patient_info, y, [150, 150])
@@ -1512,23 +1773,9 @@ def generate_pdf():
     # Laboratory Values Section
     y = draw_section_header(_("results.lab_values", "Laboratuvar Değerleri"), y)
     
-    lab_fields = [
-        ("AST", 'ast', 'IU/L', '5-40'),
-        ("ALT", 'alt', 'IU/L', '7-56'),
-        ("ALP", 'alp', 'IU/L', '44-147'),
-        ("Total Bilirubin", 'total_bilirubin', 'mg/dL', '0.3-1.2'),
-        ("Direct Bilirubin", 'direct_bilirubin', 'mg/dL', '0.0-0.3'),
-        ("Albumin", 'albumin', 'g/dL', '3.5-5.0'),
-        ("Platelets", 'trombosit', '×10³/μL', '150-450'),
-        ("INR", 'inr', '% (0-1)', '0.8-1.1'),
-        ("Creatinine", 'creatinine', 'mg/dL', '0.7-1.3'),
-        ("AFP", 'afp', 'ng/mL', '<10'),
-        ("GGT", 'ggt', 'IU/L', '9-48')
-    ]
-    
     lab_data = [[_("results.lab_name", "Parametre"), _("results.lab_value", "Değer"), _("results.lab_unit", "Birim"), _("results.lab_normal", "Normal")]]
-    for name, key, unit, normal in lab_fields:
-        value = patient.get(key, '')
+    for name, key, unit, normal in _LAB_FIELDS:
+        value = pget(key, '')
         if value != '':
             lab_data.append([name, fmt(value), unit, normal])
     
@@ -1546,25 +1793,23 @@ def generate_pdf():
     risk_data = [[_("results.disease", "Hastalık"), _("results.risk_value", "Risk (%)"), _("results.risk_level", "Seviye"), _("results.model", "Model")]]
     for disease, res in results.items():
         if isinstance(res, dict):
-            risk_level = res.get('risk_level', res.get('classification', _("results.unspecified", "Belirtilmemiş")))
-            # NAFLD special: show classification + confidence
-            risk_value = res.get('risk_percentage', res.get('risk', ''))
-            if isinstance(risk_value, float):
-                risk_value = fmt(risk_value)
+            rget = res.get
             if disease == 'nafld':
-                risk_value = fmt(res.get('confidence'))
-                classification = res.get('classification', _("results.unspecified", "Belirtilmemiş"))
-                confidence = res.get('confidence', None)
-                if confidence is not None:
-                    risk_level = f"{classification} ({fmt(confidence)}%)"
-                else:
-                    risk_level = classification
-            model = res.get('model', 'AI Model')
+                # NAFLD special: show classification + confidence
+                confidence = rget('confidence')
+                classification = rget('classification', unspecified)
+                risk_value = fmt(confidence)
+                risk_level = f"{classification} ({risk_value}%)" if confidence is not None else classification
+            else:
+                risk_level = rget('risk_level') if 'risk_level' in res else rget('classification', unspecified)
+                risk_value = rget('risk_percentage') if 'risk_percentage' in res else rget('risk', '')
+                if isinstance(risk_value, float):
+                    risk_value = fmt(risk_value)
             risk_data.append([
-                res.get('disease', disease.title()),
+                rget('disease', disease.title()),
                 risk_value,
                 risk_level,
-                model
+                rget('model', 'AI Model')
             ])
     
     y = draw_styled_table(risk_data, y, [120, 80, 100, 80], header_bg=(0.6, 0.2, 0.2))
@@ -1577,12 +1822,7 @@ def generate_pdf():
     y = draw_section_header(_("results.traditional_scores", "Geleneksel Klinik Skorlar"), y)
     
     scores_data = [[_("results.score_name", "Skor"), _("results.score_value", "Değer")]]
-    for score_name, score_value in traditional_scores.items():
-        interpretation = ''
-        if score_interpretations and score_name in score_interpretations:
-            interp = score_interpretations[score_name]
-            interpretation = interp.get('level', '')
-        scores_data.append([score_name, fmt(score_value)])
+    scores_data.extend([score_name, fmt(score_value)] for score_name, score_value in traditional_scores.items())
     
     y = draw_styled_table(scores_data, y, [200, 100], header_bg=(0.4, 0.2, 0.6))
 
@@ -1594,181 +1834,132 @@ def generate_pdf():
         y = draw_section_header(_("results.ai_assessment", "AI Doktor Değerlendirmesi"), y)
         
         def render_html_to_pdf_with_background(html_content, start_y):
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # First pass: calculate total height needed
-            temp_y = start_y
             line_height = 14
             text_margin = margin + 15
             text_width = content_width - 30
+            body_color = (0.1, 0.1, 0.1)
             
-            # Calculate content height
-            def calculate_height(element, y_pos):
-                if element.name is None:  # Text node
-                    text = element.strip()
-                    if text:
-                        lines = wrap_text(text, font_family, 10, text_width)
-                        return y_pos - (len(lines) * line_height)
-                    return y_pos
-                
-                elif element.name == 'p':
-                    text = element.get_text().strip()
-                    if text:
-                        lines = wrap_text(text, font_family, 10, text_width)
-                        return y_pos - (len(lines) * line_height) - 5
-                    return y_pos
-                
-                elif element.name in ['strong', 'b']:
-                    text = element.get_text().strip()
-                    if text:
-                        lines = wrap_text(text, font_bold, 10, text_width)
-                        return y_pos - (len(lines) * line_height)
-                    return y_pos
-                
-                elif element.name in ['em', 'i']:
-                    text = element.get_text().strip()
-                    if text:
-                        lines = wrap_text(text, font_family, 10, text_width)
-                        return y_pos - (len(lines) * line_height)
-                    return y_pos
-                
-                elif element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                    text = element.get_text().strip()
-                    if text:
-                        lines = wrap_text(text, font_bold, 12, text_width)
-                        return y_pos - (len(lines) * line_height) - 8
-                    return y_pos
-                
-                elif element.name in ['ul', 'ol']:
-                    for li in element.find_all('li', recursive=False):
-                        li_text = li.get_text().strip()
-                        if li_text:
-                            prefix = "• " if element.name == 'ul' else "1. "
-                            lines = wrap_text(f"{prefix}{li_text}", font_family, 10, text_width)
-                            y_pos -= len(lines) * line_height
-                    return y_pos
-                
-                elif element.name == 'br':
-                    return y_pos - line_height
-                
-                elif element.name == 'div':
-                    for child in element.children:
-                        y_pos = calculate_height(child, y_pos)
-                    return y_pos
-                
-                else:
-                    text = element.get_text().strip()
-                    if text:
-                        lines = wrap_text(text, font_family, 10, text_width)
-                        return y_pos - (len(lines) * line_height)
-                    return y_pos
+            # Single pass over the HTML: wrap every block once into a list of draw commands.
+            # Each command is (font, size, color, line) for a text line or (None, gap) for extra spacing.
+            commands = []
             
-            # Calculate total content height
-            content_end_y = start_y
-            for element in soup.children:
-                content_end_y = calculate_height(element, content_end_y)
+            def add_text(text, font_name, font_size, text_color=body_color):
+                for line in wrap_pdf_text(text, font_name, font_size, text_width):
+                    commands.append((font_name, font_size, text_color, line))
             
-            total_height = start_y - content_end_y + 30  # Add padding
+            def add_gap(gap):
+                commands.append((None, gap))
             
-            # Draw background box with gradient-like effect
-            bg_y = start_y - 10
-            draw_rounded_rect(margin + 5, bg_y - total_height, content_width - 10, total_height, 8, 
-                            (0.96, 0.98, 1.0), (0.85, 0.90, 0.98))
-            
-            # Add subtle inner shadow effect
-            draw_rounded_rect(margin + 7, bg_y - total_height + 2, content_width - 14, total_height - 4, 6, 
-                            (0.94, 0.96, 0.99))
-            
-            # Now render the actual content
-            # FIX: Increased top padding by changing start_y - 15 to start_y - 25
-            current_y = start_y - 25  # Start inside the background box
+            def direct_list_items(element):
+                return (child for child in element.children if child.name == 'li')
             
-            def draw_wrapped_text_with_font(text, x, y, font_name, font_size, text_color=(0.1, 0.1, 0.1)):
-                """Draw text with proper word wrapping and font setting"""
-                if not text.strip():
-                    return y
-                
-                # Set font and color
-                p.setFont(font_name, font_size)
-                p.setFillColorRGB(*text_color)
-                
-                # Wrap text
-                wrapped_lines = wrap_text(text, font_name, font_size, text_width)
-                
-                for line in wrapped_lines:
-                    current_y = check_new_page(y, line_height)
-                    p.drawString(x, current_y, line)
-                    y -= line_height
-                
-                return y
-            
-            def process_element_with_styling(element, y_pos):
+            def layout_element(element):
                 if element.name is None:  # Text node
                     text = element.strip()
                     if text:
-                        return draw_wrapped_text_with_font(text, text_margin, y_pos, font_family, 10)
-                    return y_pos
+                        add_text(text, font_family, 10)
                 
                 elif element.name == 'p':
                     text = element.get_text().strip()
                     if text:
-                        y_pos = draw_wrapped_text_with_font(text, text_margin, y_pos, font_family, 10)
-                        y_pos -= 5  # Extra spacing after paragraph
-                    return y_pos
+                        add_text(text, font_family, 10)
+                        add_gap(5)  # Extra spacing after paragraph
                 
                 elif element.name in ['strong', 'b']:
                     text = element.get_text().strip()
                     if text:
-                        return draw_wrapped_text_with_font(text, text_margin, y_pos, font_bold, 10, (0.0, 0.0, 0.0))
-                    return y_pos
+                        add_text(text, font_bold, 10, (0.0, 0.0, 0.0))
                 
                 elif element.name in ['em', 'i']:
                     text = element.get_text().strip()
                     if text:
-                        return draw_wrapped_text_with_font(text, text_margin, y_pos, font_family, 10, (0.2, 0.2, 0.2))
-                    return y_pos
+                        add_text(text, font_family, 10, (0.2, 0.2, 0.2))
                 
                 elif element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
                     text = element.get_text().strip()
                     if text:
                         font_size = 14 if element.name == 'h1' else 12 if element.name == 'h2' else 11
-                        y_pos = draw_wrapped_text_with_font(text, text_margin, y_pos, font_bold, font_size, (0.0, 0.0, 0.0))
-                        y_pos -= 8  # Extra spacing after headers
-                    return y_pos
+                        add_text(text, font_bold, font_size, (0.0, 0.0, 0.0))
+                        add_gap(8)  # Extra spacing after headers
                 
                 elif element.name == 'ul':
-                    for li in element.find_all('li', recursive=False):
-                        y_pos = check_new_page(y_pos, line_height)
+                    for li in direct_list_items(element):
                         li_text = li.get_text().strip()
                         if li_text:
-                            y_pos = draw_wrapped_text_with_font(f"• {li_text}", text_margin, y_pos, font_family, 10)
-                    return y_pos
+                            add_text(f"• {li_text}", font_family, 10)
                 
                 elif element.name == 'ol':
-                    for i, li in enumerate(element.find_all('li', recursive=False), 1):
-                        y_pos = check_new_page(y_pos, line_height)
+                    for i, li in enumerate(direct_list_items(element), 1):
                         li_text = li.get_text().strip()
                         if li_text:
-                            y_pos = draw_wrapped_text_with_font(f"{i}. {li_text}", text_margin, y_pos, font_family, 10)
-                    return y_pos
+                            add_text(f"{i}. {li_text}", font_family, 10)
                 
                 elif element.name == 'br':
-                    return y_pos - line_height
+                    add_gap(line_height)
                 
                 elif element.name == 'div':
                     for child in element.children:
-                        y_pos = process_element_with_styling(child, y_pos)
-                    return y_pos
+                        layout_element(child)
                 
                 else:
                     text = element.get_text().strip()
                     if text:
-                        return draw_wrapped_text_with_font(text, text_margin, y_pos, font_family, 10)
-                    return y_pos
+                        add_text(text, font_family, 10)
+            
+            if '<' not in html_content:
+                # Plain text: no markup to parse, lay out blank-line separated paragraphs directly
+                for paragraph in html_content.split('\n\n'):
+                    text = paragraph.strip()
+                    if text:
+                        add_text(text, font_family, 10)
+                        add_gap(5)
+            else:
+                from bs4 import BeautifulSoup
+                
+                # lxml (C parser) wraps the fragment in <html><body>, so walk the body's children
+                soup = BeautifulSoup(html_content, 'lxml')
+                root = soup.body or soup
+                for element in root.children:
+                    layout_element(element)
+            
+            content_height = sum(line_height if command[0] is not None else command[1] for command in commands)
+            total_height = content_height + 30  # Add padding
             
-            # Process all elements in the soup
-            for element in soup.children:
-                current_y = process_element_with_styling(element, current_y)
+            # Draw background box with gradient-like effect and a subtle inner shadow
+            bg_y = start_y - 10
+            draw_rounded_rect(margin + 5, bg_y - total_height, content_width - 10, total_height, 8, 
+                            (0.96, 0.98, 1.0), (0.85, 0.90, 0.98), inner_color=(0.94, 0.96, 0.99))
+            
+            # Now draw the laid-out lines, batching consecutive lines of the same style into one text object
+            # FIX: Increased top padding by changing start_y - 15 to start_y - 25
+            current_y = start_y - 25  # Start inside the background box
+            text_obj = None
+            text_style = None
+            
+            def flush():
+                if text_obj is not None:
+                    draw_text_object(text_obj, text_style[2])
+            
+            for command in commands:
+                if command[0] is None:
+                    current_y -= command[1]
+                    continue
+                
+                font_name, font_size, text_color, line = command
+                style = (font_name, font_size, text_color)
+                if text_obj is not None and (style != text_style or needs_new_page(current_y, line_height)):
+                    flush()
+                    text_obj = None
+                current_y = check_new_page(current_y, line_height)
+                if text_obj is None:
+                    text_obj = p.beginText()
+                    text_obj.setFont(font_name, font_size)
+                    text_obj.setFillColorRGB(*text_color)
+                    text_style = style
+                text_obj.setTextOrigin(text_margin, current_y)
+                text_obj.textOut(line)
+                current_y -= line_height
+            flush()
             
             return current_y - 15  # Add some bottom padding
 
@@ -1782,33 +1973,40 @@ def generate_pdf():
     disclaimer_height = 80
     draw_rounded_rect(margin, y - disclaimer_height, content_width, disclaimer_height, 5, (1.0, 0.95, 0.95), (0.8, 0.6, 0.6))
     
-    p.setFont(font_bold, 10)
-    p.setFillColorRGB(0.8, 0.2, 0.2)
-    p.drawString(margin + 10, y - 15, _("results.disclaimer_title", 'TIBBİ SORUMLULUK REDDİ:'))
+    # Title, disclaimer lines and footer all go into one text object
+    footer_text = p.beginText()
+    footer_text.setFont(font_bold, 10)
+    footer_text.setFillColorRGB(0.8, 0.2, 0.2)
+    footer_text.setTextOrigin(margin + 10, y - 15)
+    footer_text.textOut(_("results.disclaimer_title", 'TIBBİ SORUMLULUK REDDİ:'))
     
     # Properly wrap disclaimer text
-    p.setFont(font_family, 8)
-    p.setFillColorRGB(0.4, 0.4, 0.4)
+    footer_text.setFont(font_family, 8)
+    footer_text.setFillColorRGB(0.4, 0.4, 0.4)
     disclaimer = _("results.disclaimer_text", 'Bu araç laboratuvar değerleri ve klinik parametrelere dayalı risk değerlendirmesi sağlar. Sonuçlar kalifiye sağlık profesyonelleri tarafından yorumlanmalı ve klinik yargıyı veya tanı prosedürlerini değiştirmez. Yalnızca klinik araştırma ve eğitim amaçlıdır.')
     
     # Use proper word wrapping for disclaimer
-    disclaimer_lines = wrap_text(disclaimer, font_family, 8, content_width - 20)
+    disclaimer_lines = wrap_pdf_text(disclaimer, font_family, 8, content_width - 20)
     
     text_y = y - 30
     for line in disclaimer_lines[:5]:  # Limit to 5 lines to fit in box
-        p.drawString(margin + 10, text_y, line)
+        footer_text.setTextOrigin(margin + 10, text_y)
+        footer_text.textOut(line)
         text_y -= 10
     
-    # Copyright
-    p.setFont(font_family, 8)
-    p.setFillColorRGB(0.6, 0.6, 0.6)
-    p.drawString(margin, 30, '© 2025 LiverAId Risk Prediction System')
-    p.drawRightString(width - margin, 30, f"Sayfa 1")
+    # Copyright and right-aligned page label
+    page_label = "Sayfa 1"
+    footer_text.setFillColorRGB(0.6, 0.6, 0.6)
+    footer_text.setTextOrigin(margin, 30)
+    footer_text.textOut('© 2025 LiverAId Risk Prediction System')
+    footer_text.setTextOrigin(width - margin - pdfmetrics.stringWidth(page_label, font_family, 8), 30)
+    footer_text.textOut(page_label)
+    draw_text_object(footer_text, (0.6, 0.6, 0.6))
 
     p.save()
-    buffer.seek(0)
     
-    response = make_response(send_file(buffer, as_attachment=True, download_name='LiverAId_Risk_Assessment.pdf', mimetype='application/pdf'))
+    # Hand the finished bytes to the response directly (single body, Content-Length set)
+    response = app.response_class(buffer.getvalue(), mimetype='application/pdf')
     response.headers['Content-Disposition'] = 'attachment; filename=LiverAId_Risk_Assessment.pdf'
     return response
 
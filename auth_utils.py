@@ -1,65 +1,73 @@
 """
 Authentication utilities and decorators
 """
-from functools import wraps
+from functools import wraps, lru_cache
 from flask import session, redirect, url_for, request, flash
 import re
 
+# Compiled once at import time
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Registration is limited to institutional domains plus an explicit allow-list
+_INSTITUTION_SUFFIXES = ('.edu', '.gov')
+_ALLOWED_DOMAINS = frozenset()
+
 def validate_email(email: str) -> bool:
     """Validate email format and allowed domains"""
     # Basic email format validation
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if not re.match(email_pattern, email):
+    if not _EMAIL_RE.match(email):
         return False
     
-    # Check allowed domains
-    allowed_domains = [
-    ]
-    
-    domain = email.split('@')[1].lower()
+    domain = email.rpartition('@')[2].lower()
     
-    # Allow any .edu domain
-    if '.edu.' in domain or domain.endswith('.edu'):
+    # Allow any .edu / .gov domain (including country forms like .edu.tr)
+    if domain.endswith(_INSTITUTION_SUFFIXES) or '.edu.' in domain or '.gov.' in domain:
         return True
     
-    # Allow any .gov domain
-    if '.gov.' in domain or domain.endswith('.gov'):
-        return True
-        
-    return domain in allowed_domains
+    # Check allowed domains
+    return domain in _ALLOWED_DOMAINS
 
 def validate_password(password: str) -> bool:
     """Validate password strength"""
     if len(password) < 8:
         return False
     
-    if not re.search(r'[A-Z]', password):
-        return False
+    # Single pass: bit 1 = uppercase, 2 = lowercase, 4 = digit; stop once all three are seen
+    flags = 0
+    for char in password:
+        if 'A' <= char <= 'Z':
+            flags |= 1
+        elif 'a' <= char <= 'z':
+            flags |= 2
+        elif char.isdecimal():
+            flags |= 4
+        else:
+            continue
+        if flags == 7:
+            return True
     
-    if not re.search(r'[a-z]', password):
-        return False
-    
-    if not re.search(r'\d', password):
-        return False
-    
-    return True
+    return False
+
+# Base medical fields (also the translation keys under auth.medicalFields)
+_BASE_FIELDS = (
+    'Gastroenterology',
+    'Hepatology',
+    'Internal Medicine',
+    'Emergency Medicine',
+    'Family Medicine',
+    'General Surgery',
+    'Radiology',
+    'Pathology',
+    'Medical Student',
+    'Resident',
+    'Other'
+)
 
 def get_medical_fields():
     """Get list of medical fields"""
-    return [
-        'Gastroenterology',
-        'Hepatology',
-        'Internal Medicine',
-        'Emergency Medicine',
-        'Family Medicine',
-        'General Surgery',
-        'Radiology',
-        'Pathology',
-        'Medical Student',
-        'Resident',
-        'Other'
-    ]
+    return list(_BASE_FIELDS)
 
+@lru_cache(maxsize=16)
 def get_medical_fields_for_language(language='en'):
     """Get medical fields with translations for the current language"""
     from i18n import i18n
@@ -67,23 +75,8 @@ def get_medical_fields_for_language(language='en'):
     # Get the field translations for the current language
     field_translations = i18n.translations.get(language, {}).get('auth', {}).get('medicalFields', {})
     
-    # Base fields (keys)
-    base_fields = [
-        'Gastroenterology',
-        'Hepatology',
-        'Internal Medicine',
-        'Emergency Medicine',
-        'Family Medicine',
-        'General Surgery',
-        'Radiology',
-        'Pathology',
-        'Medical Student',
-        'Resident',
-        'Other'
-    ]
-    
     # Return translated fields if available, otherwise return base fields
     if field_translations:
-        return [(field, field_translations.get(field, field)) for field in base_fields]
+        return [(field, field_translations.get(field, field)) for field in _BASE_FIELDS]
     else:
-        return [(field, field) for field in base_fields]
+        return [(field, field) for field in _BASE_FIELDS]
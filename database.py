@@ -2,19 +2,179 @@
 Database configuration and utilities for PostgreSQL
 """
 import psycopg2
+import psycopg2.errors
 import psycopg2.extras
+from psycopg2.pool import ThreadedConnectionPool
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+import atexit
+import hmac
 import os
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
 import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+# Idempotent schema setup, run once per process by DatabaseManager.init_tables
+_SCHEMA_DDL = """
+    SELECT pg_advisory_xact_lock(4711);
+
+    CREATE TABLE IF NOT EXISTS users (
+        id SERIAL PRIMARY KEY,
+        name_surname VARCHAR(512) GENERATED ALWAYS AS (first_name || ' ' || last_name) STORED,
+        first_name VARCHAR(255) NOT NULL,
+        last_name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) UNIQUE NOT NULL,
+        password_hash VARCHAR(255) NOT NULL,
+        medical_field VARCHAR(255) NOT NULL,
+        organization VARCHAR(255) NOT NULL,
+        diploma_number VARCHAR(255) NOT NULL,
+        years_experience INTEGER DEFAULT 0,
+        phone VARCHAR(50) DEFAULT '',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        is_active BOOLEAN DEFAULT TRUE
+    );
+
+    ALTER TABLE users ADD COLUMN IF NOT EXISTS doctor_title VARCHAR(100) DEFAULT 'Dr.';
+
+    -- Older databases predate the first_name/last_name split
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'users' AND column_name = 'first_name'
+        ) THEN
+            ALTER TABLE users ADD COLUMN first_name VARCHAR(255) DEFAULT '';
+            ALTER TABLE users ADD COLUMN IF NOT EXISTS last_name VARCHAR(255) DEFAULT '';
+            ALTER TABLE users ADD COLUMN IF NOT EXISTS years_experience INTEGER DEFAULT 0;
+            ALTER TABLE users ADD COLUMN IF NOT EXISTS phone VARCHAR(50) DEFAULT '';
+
+            UPDATE users
+            SET first_name = SPLIT_PART(name_surname, ' ', 1),
+                last_name = CASE
+                    WHEN ARRAY_LENGTH(STRING_TO_ARRAY(name_surname, ' '), 1) > 1
+                    THEN SUBSTRING(name_surname FROM POSITION(' ' IN name_surname) + 1)
+                    ELSE ''
+                END
+            WHERE (first_name IS NULL OR first_name = '') AND name_surname IS NOT NULL;
+
+            ALTER TABLE users ALTER COLUMN first_name SET NOT NULL;
+            ALTER TABLE users ALTER COLUMN last_name SET NOT NULL;
+        END IF;
+    END
+    $$;
+
+    -- name_surname used to be written by the app; derive it in the database
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'users' AND column_name = 'name_surname' AND is_generated = 'NEVER'
+        ) THEN
+            ALTER TABLE users DROP COLUMN name_surname;
+            ALTER TABLE users ADD COLUMN name_surname VARCHAR(512)
+                GENERATED ALWAYS AS (first_name || ' ' || last_name) STORED;
+        END IF;
+    END
+    $$;
+
+    CREATE TABLE IF NOT EXISTS user_sessions (
+        id SERIAL PRIMARY KEY,
+        user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+        session_data JSONB,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Case-insensitive unique email among active users, covering the auth
+    -- lookups so they are index-only scans. Plain email lookups use the
+    -- UNIQUE constraint's index, so no separate email index is kept.
+    DO $$
+    BEGIN
+        CREATE UNIQUE INDEX IF NOT EXISTS users_lower_email ON users(lower(email))
+            INCLUDE (id, first_name, last_name, email, password_hash, medical_field, organization, diploma_number, doctor_title)
+            WHERE is_active = TRUE;
+    EXCEPTION WHEN unique_violation THEN
+        RAISE WARNING 'users_lower_email not created: active accounts differ only in email case';
+    END
+    $$;
+    -- Earlier version of the index above, without email in INCLUDE
+    DROP INDEX IF EXISTS users_email_lower;
+    DROP INDEX IF EXISTS idx_users_email_cover;
+    DROP INDEX IF EXISTS idx_users_email;
+"""
+_tables_initialized = False
+
+# Hot auth queries, prepared once per pooled connection
+_USER_COLUMNS = "id, first_name, last_name, email, medical_field, organization, diploma_number, doctor_title"
+_PREPARED_STATEMENTS = {
+    'get_user_by_email': f"SELECT {_USER_COLUMNS} FROM users WHERE lower(email) = lower($1) AND is_active = TRUE",
+    'get_user_for_login': f"SELECT {_USER_COLUMNS}, password_hash FROM users WHERE lower(email) = lower($1) AND is_active = TRUE",
+    'get_user_by_id': f"SELECT {_USER_COLUMNS} FROM users WHERE id = $1 AND is_active = TRUE",
+    # Revalidates a cached login: no row once the user is deactivated or the hash changes
+    'get_user_for_cached_login': f"SELECT {_USER_COLUMNS} FROM users WHERE id = $1 AND password_hash = $2 AND is_active = TRUE",
+    # Exact match covers inactive rows (UNIQUE constraint), lower() the active index
+    'email_exists': "SELECT 1 FROM users WHERE email = $1 OR (lower(email) = lower($1) AND is_active = TRUE)",
+}
+
+
+class _PreparingConnection(psycopg2.extensions.connection):
+    """Connection that remembers whether the auth statements were prepared on it"""
+    prepared = False
 
 class DatabaseManager:
+    _DOCTOR_TITLES = (
+        "Dr.",
+        "Prof. Dr.",
+        "Doç. Dr.",
+        "Öğr. Gör. Dr.",
+        "Uzm. Dr.",
+        "Op. Dr.",
+        "Dt.",
+        "Vet.",
+        "Ebe",
+        "Hemşire"
+    )
+    
     def __init__(self):
         self.host = os.environ.get('DB_HOST', 'localhost')
         self.port = os.environ.get('DB_PORT', '5432')
         self.database = os.environ.get('DB_NAME', 'liver_assessment')
         self.user = os.environ.get('DB_USER', 'postgres')
         self.password = os.environ.get('DB_PASSWORD')
+        # With DB_UNIX_SOCKET=1 a local server is reached over its Unix socket (libpq's
+        # default when no host is given), skipping the TCP handshake
+        use_socket = os.environ.get('DB_UNIX_SOCKET', '0') == '1' and self.host in ('localhost', '127.0.0.1', '')
+        self.connect_host = None if use_socket else self.host
+        
+        # Connection pool for the application database, created on first use
+        self.pool_min = int(os.environ.get('DB_POOL_MIN', 1))
+        self.pool_max = int(os.environ.get('DB_POOL_MAX', 16))
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        
+        # New passwords use memory-hard Argon2id (19 MiB, 2 passes); legacy
+        # bcrypt hashes are still accepted and upgraded on the next login
+        self._hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+        # Both hashers release the GIL, so create_users_bulk hashes its batch in
+        # parallel across cores; the pool caps that at one hash per CPU.
+        # Single logins and sign-ups hash inline on the request thread
+        self._hash_pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix='password-hash')
+        # Checked against for unknown emails so a miss costs as much as a wrong password
+        self._dummy_hash = self._hasher.hash(os.urandom(16).hex())
+        
+        # Short-lived LRU of successful logins, keyed by an HMAC of email and
+        # password under a per-process secret, so repeat logins skip hashing.
+        # Hits are revalidated against the row, so they never outlive a
+        # deactivation or password change
+        self._login_cache = OrderedDict()
+        self._login_cache_lock = threading.Lock()
+        self._login_cache_max = 4096
+        self._login_cache_ttl = 60
+        self._cache_secret = os.urandom(32)
         
         # Create database if it doesn't exist
         self.create_database_if_not_exists()
@@ -22,11 +182,13 @@ class DatabaseManager:
         self.init_tables()
     
     def create_database_if_not_exists(self):
-        """Create the database if it doesn't exist"""
+        """Create the database if it doesn't exist (only when DB_AUTO_CREATE=1)"""
+        if os.environ.get('DB_AUTO_CREATE', '0') != '1':
+            return
         try:
             # Connect to default postgres database to create our database
             conn = psycopg2.connect(
-                host=self.host,
+                host=self.connect_host,
                 port=self.port,
                 database='postgres',
                 user=self.user,
@@ -35,14 +197,10 @@ class DatabaseManager:
             conn.autocommit = True
             cursor = conn.cursor()
             
-            # Check if database exists
-            cursor.execute("SELECT 1 FROM pg_catalog.pg_database WHERE datname = %s", (self.database,))
-            exists = cursor.fetchone()
-            
-            if not exists:
+            try:
                 cursor.execute(f'CREATE DATABASE "{self.database}"')
                 print(f"✅ Database '{self.database}' created successfully")
-            else:
+            except psycopg2.errors.DuplicateDatabase:
                 print(f"✅ Database '{self.database}' already exists")
             
             cursor.close()
@@ -50,146 +208,99 @@ class DatabaseManager:
         except Exception as e:
             print(f"❌ Error creating database: {e}")
     
+    def _get_pool(self) -> ThreadedConnectionPool:
+        """Return the connection pool, creating it on first use"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadedConnectionPool(
+                        self.pool_min,
+                        self.pool_max,
+                        host=self.connect_host,
+                        port=self.port,
+                        database=self.database,
+                        user=self.user,
+                        password=self.password,
+                        connection_factory=_PreparingConnection,
+                        cursor_factory=psycopg2.extras.RealDictCursor
+                    )
+                    atexit.register(self._pool.closeall)
+        return self._pool
+    
     @contextmanager
-    def get_connection(self):
-        """Get database connection with context manager"""
+    def get_connection(self, prepare: bool = True):
+        """Get a pooled database connection with context manager"""
+        pool = self._get_pool()
         conn = None
         try:
-            conn = psycopg2.connect(
-                host=self.host,
-                port=self.port,
-                database=self.database,
-                user=self.user,
-                password=self.password,
-                cursor_factory=psycopg2.extras.RealDictCursor
-            )
+            conn = pool.getconn()
+            if prepare and not conn.prepared:
+                self._prepare_statements(conn)
             yield conn
         except Exception as e:
-            if conn:
+            if conn and not conn.closed:
                 conn.rollback()
             raise e
         finally:
             if conn:
-                conn.close()
+                # The pool rolls back any open transaction and drops broken connections
+                pool.putconn(conn, close=bool(conn.closed))
+    
+    @contextmanager
+    def get_read_connection(self):
+        """Get a pooled connection in autocommit mode for single read-only queries"""
+        with self.get_connection() as conn:
+            # Client-side switch: no BEGIN is sent and nothing is left to roll back on return
+            conn.autocommit = True
+            try:
+                yield conn
+            finally:
+                if not conn.closed:
+                    conn.autocommit = False
+    
+    def _prepare_statements(self, conn):
+        """PREPARE the hot auth queries once per connection (they live for its session)"""
+        cursor = conn.cursor()
+        cursor.execute(";".join(
+            f"PREPARE {name} AS {sql}" for name, sql in _PREPARED_STATEMENTS.items()
+        ))
+        conn.commit()
+        conn.prepared = True
     
     def init_tables(self):
         """Initialize database tables"""
+        global _tables_initialized
+        if _tables_initialized:
+            return
         try:
-            with self.get_connection() as conn:
+            # Skip preparing: the tables the statements reference may not exist yet
+            with self.get_connection(prepare=False) as conn:
                 cursor = conn.cursor()
-                
-                # Create users table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS users (
-                        id SERIAL PRIMARY KEY,
-                        name_surname VARCHAR(255) NOT NULL,
-                        first_name VARCHAR(255) NOT NULL,
-                        last_name VARCHAR(255) NOT NULL,
-                        email VARCHAR(255) UNIQUE NOT NULL,
-                        password_hash VARCHAR(255) NOT NULL,
-                        medical_field VARCHAR(255) NOT NULL,
-                        organization VARCHAR(255) NOT NULL,
-                        diploma_number VARCHAR(255) NOT NULL,
-                        years_experience INTEGER DEFAULT 0,
-                        phone VARCHAR(50) DEFAULT '',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        is_active BOOLEAN DEFAULT TRUE
-                    )
-                """)
-                
-                # Add missing columns if they don't exist (for existing databases)
-                self._add_missing_columns(cursor)
-                
-                # Create user_sessions table for storing assessment data
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS user_sessions (
-                        id SERIAL PRIMARY KEY,
-                        user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                        session_data JSONB,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                # Create index on email for faster lookups
-                cursor.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)
-                """)
-                
+                # All DDL in one round-trip; the advisory lock serializes
+                # workers starting at the same time
+                cursor.execute(_SCHEMA_DDL)
                 conn.commit()
+                _tables_initialized = True
                 print("✅ Database tables initialized successfully")
                 
         except Exception as e:
             print(f"❌ Error initializing tables: {e}")
     
-    def _add_missing_columns(self, cursor):
-        """Add missing columns to existing users table"""
-        try:
-            # Check if doctor_title column exists (most recent addition)
-            cursor.execute("""
-                SELECT column_name FROM information_schema.columns 
-                WHERE table_name='users' AND column_name='doctor_title'
-            """)
-            
-            if not cursor.fetchone():
-                print("Adding doctor_title column to users table...")
-                cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS doctor_title VARCHAR(100) DEFAULT 'Dr.'")
-                print("✅ doctor_title column added successfully")
-            
-            # Check if first_name column exists (older migration)
-            cursor.execute("""
-                SELECT column_name FROM information_schema.columns 
-                WHERE table_name='users' AND column_name='first_name'
-            """)
-            
-            if not cursor.fetchone():
-                print("Adding missing columns to users table...")
-                
-                # Add first_name and last_name columns
-                cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS first_name VARCHAR(255) DEFAULT ''")
-                cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_name VARCHAR(255) DEFAULT ''")
-                cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS years_experience INTEGER DEFAULT 0")
-                cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS phone VARCHAR(50) DEFAULT ''")
-                
-                # Update existing records to populate first_name and last_name from name_surname
-                cursor.execute("""
-                    UPDATE users 
-                    SET first_name = SPLIT_PART(name_surname, ' ', 1),
-                        last_name = CASE 
-                            WHEN ARRAY_LENGTH(STRING_TO_ARRAY(name_surname, ' '), 1) > 1 
-                            THEN SUBSTRING(name_surname FROM POSITION(' ' IN name_surname) + 1)
-                            ELSE ''
-                        END
-                    WHERE (first_name IS NULL OR first_name = '') AND name_surname IS NOT NULL
-                """)
-                
-                # Now make first_name and last_name NOT NULL
-                cursor.execute("ALTER TABLE users ALTER COLUMN first_name SET NOT NULL")
-                cursor.execute("ALTER TABLE users ALTER COLUMN last_name SET NOT NULL")
-                
-                print("✅ Missing columns added successfully")
-                
-        except Exception as e:
-            print(f"❌ Error adding missing columns: {e}")
-    
     def create_user(self, email: str, password: str, first_name: str, last_name: str,
                    medical_field: str, organization: str, diploma_number: str, 
                    years_experience: int = 0, phone: str = "", doctor_title: str = "Dr.") -> Optional[int]:
         """Create a new user"""
         try:
             # Hash password
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            
-            # Combine first and last name for compatibility
-            name_surname = f"{first_name} {last_name}"
+            password_hash = self._hasher.hash(password)
             
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
-                    INSERT INTO users (name_surname, email, password_hash, medical_field, organization, diploma_number, first_name, last_name, years_experience, phone, doctor_title)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    INSERT INTO users (email, password_hash, medical_field, organization, diploma_number, first_name, last_name, years_experience, phone, doctor_title)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                     RETURNING id
-                """, (name_surname, email, password_hash, medical_field, organization, diploma_number, first_name, last_name, years_experience, phone, doctor_title))
+                """, (email, password_hash, medical_field, organization, diploma_number, first_name, last_name, years_experience, phone, doctor_title))
                 
                 user_id = cursor.fetchone()['id']
                 conn.commit()
@@ -202,6 +313,38 @@ class DatabaseManager:
             print(f"❌ Error creating user: {e}")
             return None
     
+    def create_users_bulk(self, users: List[Dict[str, Any]]) -> List[int]:
+        """Create many users in one statement; takes create_user's fields as dicts"""
+        try:
+            # Hash in parallel on the hashing pool
+            password_hashes = self._hash_pool.map(self._hasher.hash, [user['password'] for user in users])
+            rows = [
+                (user['email'], password_hash,
+                 user['medical_field'], user['organization'], user['diploma_number'],
+                 user['first_name'], user['last_name'], user.get('years_experience', 0),
+                 user.get('phone', ""), user.get('doctor_title', "Dr."))
+                for user, password_hash in zip(users, password_hashes)
+            ]
+            
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                # execute_values sends one multi-row INSERT per page instead of a round-trip per row
+                result = psycopg2.extras.execute_values(cursor, """
+                    INSERT INTO users (email, password_hash, medical_field, organization, diploma_number, first_name, last_name, years_experience, phone, doctor_title)
+                    VALUES %s
+                    RETURNING id
+                """, rows, page_size=500, fetch=True)
+                
+                conn.commit()
+                return [row['id'] for row in result]
+                
+        except psycopg2.IntegrityError:
+            # At least one email already exists; nothing was inserted
+            return []
+        except Exception as e:
+            print(f"❌ Error creating users: {e}")
+            return []
+    
     def verify_user_credentials(self, email: str, password: str) -> Optional[Dict[str, Any]]:
         """Verify user credentials and return user data"""
         return self.verify_user(email, password)
@@ -209,38 +352,117 @@ class DatabaseManager:
     def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Get user by email address"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT id, first_name, last_name, email, medical_field, organization, diploma_number, doctor_title
-                    FROM users 
-                    WHERE email = %s AND is_active = TRUE
-                """, (email,))
+                cursor.execute("EXECUTE get_user_by_email (%s)", (email,))
                 
                 user = cursor.fetchone()
-                return dict(user) if user else None
+                return user or None
         except Exception as e:
             print(f"❌ Error getting user by email: {e}")
             return None
     
+    def _check_password(self, password: str, password_hash: str) -> Tuple[bool, bool]:
+        """Check a password against a stored hash; returns (matches, needs_rehash)"""
+        if password_hash.startswith('$2'):
+            # Legacy bcrypt hash, upgraded to Argon2id once verified
+            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8')), True
+        try:
+            self._hasher.verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False, False
+        return True, self._hasher.check_needs_rehash(password_hash)
+    
+    def _rehash_password(self, user_id: int, password: str) -> Optional[str]:
+        """Store a fresh Argon2id hash for a user after a successful login; returns it"""
+        try:
+            password_hash = self._hasher.hash(password)
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE users SET password_hash = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                    (password_hash, user_id)
+                )
+                conn.commit()
+            return password_hash
+        except Exception as e:
+            print(f"❌ Error upgrading password hash: {e}")
+            return None
+    
+    def _login_cache_key(self, email: str, password: str) -> bytes:
+        """Derive the login cache key without keeping the cleartext password"""
+        return hmac.new(self._cache_secret, f"{email}:{password}".encode('utf-8'), 'sha256').digest()
+    
+    def _get_cached_login(self, key: bytes) -> Optional[Tuple[int, str]]:
+        """Return the cached (user id, password hash) for a login key if it has not expired"""
+        with self._login_cache_lock:
+            entry = self._login_cache.get(key)
+            if entry is None:
+                return None
+            expires, user_id, password_hash = entry
+            if expires < time.monotonic():
+                del self._login_cache[key]
+                return None
+            self._login_cache.move_to_end(key)
+            return user_id, password_hash
+    
+    def _cache_login(self, key: bytes, user_id: int, password_hash: str):
+        """Remember a successful login for the cache TTL"""
+        with self._login_cache_lock:
+            self._login_cache[key] = (time.monotonic() + self._login_cache_ttl, user_id, password_hash)
+            self._login_cache.move_to_end(key)
+            if len(self._login_cache) > self._login_cache_max:
+                self._login_cache.popitem(last=False)
+    
+    def _forget_cached_login(self, key: bytes):
+        """Drop a cached login that no longer matches the user row"""
+        with self._login_cache_lock:
+            self._login_cache.pop(key, None)
+    
+    def _revalidate_cached_login(self, key: bytes, user_id: int, password_hash: str) -> Optional[Dict[str, Any]]:
+        """Fetch the user for a cached login, or None if deactivated or the password changed"""
+        with self.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("EXECUTE get_user_for_cached_login (%s, %s)", (user_id, password_hash))
+            user = cursor.fetchone()
+        if not user:
+            self._forget_cached_login(key)
+            return None
+        return user
+    
     def verify_user(self, email: str, password: str) -> Optional[Dict[str, Any]]:
         """Verify user credentials and return user data"""
+        cache_key = self._login_cache_key(email, password)
+        cached = self._get_cached_login(cache_key)
         try:
+            if cached is not None:
+                # A cheap indexed check instead of hashing; a miss falls through
+                # to the full check so a changed hash is read fresh
+                user = self._revalidate_cached_login(cache_key, *cached)
+                if user:
+                    return user
+            
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT id, first_name, last_name, email, password_hash, medical_field, organization, diploma_number, doctor_title
-                    FROM users 
-                    WHERE email = %s AND is_active = TRUE
-                """, (email,))
+                cursor.execute("EXECUTE get_user_for_login (%s)", (email,))
                 
                 user = cursor.fetchone()
-                if user and bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
-                    # Remove password_hash from returned data
-                    user_data = dict(user)
-                    del user_data['password_hash']
-                    return user_data
+            
+            # Check the password after the connection is back in the pool
+            if not user:
+                # Equalize timing with the found-user path to avoid email enumeration
+                self._check_password(password, self._dummy_hash)
                 return None
+            matches, needs_rehash = self._check_password(password, user['password_hash'])
+            if matches:
+                # RealDictRow is already a dict; drop the hash in place
+                password_hash = user.pop('password_hash')
+                if needs_rehash:
+                    password_hash = self._rehash_password(user['id'], password)
+                if password_hash:
+                    self._cache_login(cache_key, user['id'], password_hash)
+                return user
+            return None
                 
         except Exception as e:
             print(f"❌ Error verifying user: {e}")
@@ -249,16 +471,12 @@ class DatabaseManager:
     def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user by ID"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT id, first_name, last_name, email, medical_field, organization, diploma_number, doctor_title
-                    FROM users 
-                    WHERE id = %s AND is_active = TRUE
-                """, (user_id,))
+                cursor.execute("EXECUTE get_user_by_id (%s)", (user_id,))
                 
                 user = cursor.fetchone()
-                return dict(user) if user else None
+                return user or None
                 
         except Exception as e:
             print(f"❌ Error getting user: {e}")
@@ -267,28 +485,17 @@ class DatabaseManager:
     def email_exists(self, email: str) -> bool:
         """Check if email already exists"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT 1 FROM users WHERE email = %s", (email,))
+                cursor.execute("EXECUTE email_exists (%s)", (email,))
                 return cursor.fetchone() is not None
         except Exception as e:
             print(f"❌ Error checking email: {e}")
             return False
     
-    def get_doctor_titles(self) -> List[str]:
+    def get_doctor_titles(self) -> Tuple[str, ...]:
         """Get available doctor titles"""
-        return [
-            "Dr.",
-            "Prof. Dr.",
-            "Doç. Dr.",
-            "Öğr. Gör. Dr.",
-            "Uzm. Dr.",
-            "Op. Dr.",
-            "Dt.",
-            "Vet.",
-            "Ebe",
-            "Hemşire"
-        ]
+        return self._DOCTOR_TITLES
 
 # Global database instance
 db = DatabaseManager()
@@ -0,0 +1,19 @@
+"""Gunicorn settings, picked up automatically from the working directory."""
+import os
+
+from dotenv import load_dotenv
+
+# app.py is only imported in the workers, so read .env here too for the master
+load_dotenv()
+
+
+def on_starting(server):
+    # With MODEL_PRELOAD=1 the NAFLD model is loaded once in the master, so
+    # forked workers inherit the already-populated module singleton and share
+    # its pages copy-on-write instead of each unpickling their own copy.
+    # Only the load happens here; no prediction runs before the fork.
+    if os.environ.get('MODEL_PRELOAD', '0') != '1':
+        return
+    from models.nafld_model import _get_model
+    _get_model()
+    server.log.info("NAFLD model preloaded before forking workers")
@@ -3,19 +3,43 @@ Server-side internationalization module for LiverAId
 Handles translations for Turkish and English languages
 """
 
-import json
 import os
+import orjson
 from typing import Dict, Any, Optional
 from flask import session
 
 
+def _flatten(data: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+    """Flatten nested translations into dotted keys ("form.age"), keeping sections too"""
+    flat = {}
+    for key, value in data.items():
+        path = f'{prefix}{key}'
+        flat[path] = value
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{path}.'))
+    return flat
+
+
 class I18nManager:
     """Server-side internationalization manager"""
     
     def __init__(self, app=None):
         self.translations = {}
+        self._flat_translations = {}
+        self._payloads = {}
         self.default_language = 'tr'
         self.supported_languages = ['tr', 'en']
+        self._reload_callbacks = []
+        self._language_info = {
+            lang: {
+                'current': lang,
+                'name': 'Türkçe' if lang == 'tr' else 'English',
+                'flag': '🇹🇷' if lang == 'tr' else '🇺🇸',
+                'speech_code': 'tr-TR' if lang == 'tr' else 'en-US',
+                'supported': self.supported_languages
+            }
+            for lang in self.supported_languages
+        }
         
         if app:
             self.init_app(app)
@@ -43,15 +67,38 @@ class I18nManager:
         for lang in self.supported_languages:
             file_path = os.path.join(translations_dir, f'{lang}.json')
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    self.translations[lang] = json.load(f)
+                # orjson parses the UTF-8 bytes directly, skipping text decoding
+                with open(file_path, 'rb') as f:
+                    self.translations[lang] = orjson.loads(f.read())
                 print(f"✅ Loaded translations for {lang}")
             except FileNotFoundError:
                 print(f"❌ Translation file not found: {file_path}")
                 self.translations[lang] = {}
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 print(f"❌ Invalid JSON in {file_path}: {e}")
                 self.translations[lang] = {}
+        
+        # Resolve the default-language fallback up front so a lookup is a single get
+        default_flat = _flatten(self.translations.get(self.default_language, {}))
+        self._flat_translations = {
+            lang: {**default_flat, **_flatten(self.translations[lang])}
+            for lang in self.supported_languages
+        }
+        
+        # Pre-encode the /api/translations body per language
+        self._payloads = {
+            lang: self._encode_payload(lang)
+            for lang in self.supported_languages
+        }
+        
+        # Let caches derived from the translations rebuild
+        for callback in self._reload_callbacks:
+            callback()
+    
+    def on_reload(self, callback):
+        """Register a callable run after translations are (re)loaded, e.g. a cache_clear"""
+        self._reload_callbacks.append(callback)
+        return callback
     
     def get_current_language(self) -> str:
         """Get current language from session or use default"""
@@ -79,21 +126,7 @@ class I18nManager:
         if language is None:
             language = self.get_current_language()
         
-        if language not in self.translations:
-            language = self.default_language
-        
-        # Navigate through nested object
-        keys = key_path.split('.')
-        value = self.translations.get(language, {})
-        
-        for key in keys:
-            if isinstance(value, dict) and key in value:
-                value = value[key]
-            else:
-                # Fallback to default language
-                if language != self.default_language:
-                    return self.get_translation(key_path, self.default_language, **kwargs)
-                return key_path
+        value = self._lookup(language, key_path)
         
         # Handle string formatting
         if isinstance(value, str) and kwargs:
@@ -104,12 +137,23 @@ class I18nManager:
         
         return value
     
+    def _lookup(self, language: str, key_path: str) -> Any:
+        """Translation for a key in a language, falling back to the default language, then the key"""
+        table = self._flat_translations.get(language)
+        if table is None:
+            table = self._flat_translations.get(self.default_language, {})
+        return table.get(key_path, key_path)
+    
     def t(self, key_path: str, **kwargs) -> str:
         """Shorthand for get_translation"""
+        if not kwargs:
+            return self._lookup(self.get_current_language(), key_path)
         return self.get_translation(key_path, **kwargs)
     
     def translate_filter(self, key_path: str, **kwargs) -> str:
         """Jinja2 filter for translations"""
+        if not kwargs:
+            return self._lookup(self.get_current_language(), key_path)
         return self.get_translation(key_path, **kwargs)
     
     def get_all_translations(self, language: Optional[str] = None) -> Dict[str, Any]:
@@ -119,16 +163,31 @@ class I18nManager:
         
         return self.translations.get(language, {})
     
+    def _encode_payload(self, language: str) -> bytes:
+        """JSON body of the translations endpoint for a language"""
+        info = self._language_info.get(language) or {**self._language_info['en'], 'current': language}
+        return orjson.dumps(
+            {'translations': self.translations.get(language, {}), 'language_info': info},
+            option=orjson.OPT_SORT_KEYS
+        )
+    
+    def get_translations_payload(self, language: Optional[str] = None) -> bytes:
+        """Pre-encoded JSON of all translations plus language info (for client-side use)"""
+        if language is None:
+            language = self.get_current_language()
+        
+        payload = self._payloads.get(language)
+        if payload is None:
+            payload = self._encode_payload(language)
+        return payload
+    
     def get_language_info(self) -> Dict[str, Any]:
         """Get current language information for templates"""
         current_lang = self.get_current_language()
-        return {
-            'current': current_lang,
-            'name': 'Türkçe' if current_lang == 'tr' else 'English',
-            'flag': '🇹🇷' if current_lang == 'tr' else '🇺🇸',
-            'speech_code': 'tr-TR' if current_lang == 'tr' else 'en-US',
-            'supported': self.supported_languages
-        }
+        info = self._language_info.get(current_lang)
+        if info is None:
+            return {**self._language_info['en'], 'current': current_lang}
+        return info.copy()
 
 
 # Global instance
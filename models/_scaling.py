@@ -0,0 +1,20 @@
+"""
+StandardScaler fast path shared by the disease models
+Applies a fitted scaler's arithmetic directly, skipping sklearn's per-call validation
+"""
+
+import numpy as np
+from typing import Tuple
+
+
+def scaler_statistics(scaler) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the (mean, scale) a fitted StandardScaler applies, honouring with_mean / with_std"""
+    n_features = scaler.n_features_in_
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+    return mean, scale
+
+
+def standardize(x: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Same operations as StandardScaler.transform, so results are bit-identical"""
+    return (x - mean) / scale
@@ -6,11 +6,56 @@ Enhanced with real trained model and clinical scoring systems
 import numpy as np
 import pandas as pd
 from typing import Dict, Any, Tuple
+import bisect
+import functools
 import joblib
+from joblib import Parallel, delayed
+import logging
+import math
 import os
+import threading
 from sklearn.preprocessing import StandardScaler
 from sklearn.impute import SimpleImputer
 
+from ._scaling import scaler_statistics, standardize
+
+try:
+    import tl2cgen
+    TL2CGEN_AVAILABLE = True
+except ImportError:
+    # tl2cgen is optional - predictions go through XGBoost when it is missing
+    TL2CGEN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Risk bands: probability < 0.3 is Low, < 0.7 Moderate, otherwise High
+_RISK_THRESHOLDS = (0.3, 0.7)
+_RISK_LEVELS = (("Low", "success"), ("Moderate", "warning"), ("High", "danger"))
+# Rule-based fallback scoring: one (bucket search, thresholds, weight per bucket)
+# row per indicator. bisect_left buckets "value > threshold" rules and
+# bisect_right buckets "value < threshold" rules.
+_RISK_RULES = (
+    (bisect.bisect_left, (40, 50, 60), (0.0, 0.05, 0.10, 0.15)),      # Age, especially > 50
+    (bisect.bisect_left, (1, 1.5, 2), (0.0, 0.10, 0.15, 0.20)),       # AST/ALT ratio > 1
+    (bisect.bisect_right, (100, 150, 200), (0.25, 0.15, 0.10, 0.0)),  # Thrombocytopenia (portal hypertension)
+    (bisect.bisect_right, (3.0, 3.5, 4.0), (0.20, 0.15, 0.10, 0.0)),  # Hypoalbuminemia
+    (bisect.bisect_left, (1.1, 1.3, 1.5), (0.0, 0.10, 0.15, 0.20)),   # INR (coagulopathy)
+    (bisect.bisect_left, (1.2, 1.5, 2.0), (0.0, 0.05, 0.10, 0.15)),   # Total bilirubin
+    (bisect.bisect_left, (30, 35), (0.0, 0.05, 0.10)),                # BMI (obesity)
+    (bisect.bisect_left, (150, 200), (0.0, 0.05, 0.10)),              # ALP elevation
+)
+
+_RISK_SUMMARIES = {
+    "Low": "Low cirrhosis risk based on current laboratory values.",
+    "Moderate": "Moderate cirrhosis risk detected. Enhanced monitoring recommended.",
+    "High": "High cirrhosis risk indicated. Immediate clinical evaluation advised.",
+}
+_RISK_RECOMMENDATIONS = {
+    "Low": "Low risk - routine monitoring and lifestyle modifications advised.",
+    "Moderate": "Moderate risk - consider hepatology referral and regular monitoring.",
+    "High": "High risk warrants urgent hepatology consultation.",
+}
+
 
 class CirrhosisRiskModel:
     def __init__(self):
@@ -18,6 +63,8 @@ class CirrhosisRiskModel:
         self.model_path_xgb = os.path.join(os.path.dirname(__file__), 'cirrhosis_model_xgb.pkl')
         self.scaler_path_xgb = os.path.join(os.path.dirname(__file__), 'cirrhosis_scaler_xgb.pkl')
         self.imputer_path_xgb = os.path.join(os.path.dirname(__file__), 'cirrhosis_imputer_xgb.pkl')
+        # Ahead-of-time compiled copy of the XGBoost trees (see export_compiled_model)
+        self.compiled_model_path = os.path.join(os.path.dirname(__file__), 'cirrhosis_model_xgb.so')
         
         # Fallback to old model paths
         self.model_path = os.path.join(os.path.dirname(__file__), 'cirrhosis_model.pkl')
@@ -30,6 +77,11 @@ class CirrhosisRiskModel:
         self.scaler = None
         self.imputer = None
         self.model_type = None
+        self.predictor = None
+        self._booster = None
+        self._iteration_range = (0, 0)
+        self._scaler_mean = None
+        self._scaler_scale = None
         
         # XGBoost model uses these feature names (from actual dataset)
         self.xgb_feature_names = [
@@ -85,130 +137,205 @@ class CirrhosisRiskModel:
                 os.path.exists(self.scaler_path_xgb) and 
                 os.path.exists(self.imputer_path_xgb)):
                 
-                self.model = joblib.load(self.model_path_xgb)
-                self.scaler = joblib.load(self.scaler_path_xgb)
-                self.imputer = joblib.load(self.imputer_path_xgb)
+                self.model, self.scaler, self.imputer = self._load_artifacts(
+                    self.model_path_xgb, self.scaler_path_xgb, self.imputer_path_xgb)
                 self.model_type = 'XGBoost'
+                # One row per call: thread-pool startup costs more than the tree walk
+                self.model.set_params(n_jobs=1)
+                self._booster = self.model.get_booster()
+                self._booster.set_param({'nthread': 1})
+                # Match the wrapper's predict_proba when the model was early-stopped
+                best_iteration = getattr(self.model, 'best_iteration', None)
+                if best_iteration is not None:
+                    self._iteration_range = (0, best_iteration + 1)
+                if TL2CGEN_AVAILABLE and os.path.exists(self.compiled_model_path):
+                    self.predictor = tl2cgen.Predictor(self.compiled_model_path, nthread=1)
+                    logger.info("Compiled cirrhosis predictor loaded")
                 self.feature_names = self.xgb_feature_names
-                print("✅ XGBoost cirrhosis model loaded successfully")
+                logger.info("XGBoost cirrhosis model loaded successfully")
                 
             # Fallback to legacy model
             elif (os.path.exists(self.model_path) and 
                   os.path.exists(self.scaler_path) and 
                   os.path.exists(self.imputer_path)):
                 
-                self.model = joblib.load(self.model_path)
-                self.scaler = joblib.load(self.scaler_path)
-                self.imputer = joblib.load(self.imputer_path)
+                self.model, self.scaler, self.imputer = self._load_artifacts(
+                    self.model_path, self.scaler_path, self.imputer_path)
                 self.model_type = 'Legacy'
                 self.feature_names = self.legacy_feature_names
-                print("✅ Legacy cirrhosis model loaded successfully")
+                self._cache_scaler_statistics()
+                logger.info("Legacy cirrhosis model loaded successfully")
                 
             else:
-                print("⚠️  Cirrhosis model files not found, using rule-based calculations")
+                logger.warning("Cirrhosis model files not found, using rule-based calculations")
                 self.model = None
                 self.model_type = 'Rule-based'
                 
         except Exception as e:
-            print(f"❌ Error loading cirrhosis model: {e}")
+            logger.error("Error loading cirrhosis model: %s", e)
             self.model = None
             self.model_type = 'Rule-based'
+        
+        self._build_lookups()
+        self._warm_up()
+    
+    @staticmethod
+    def _load_artifacts(*paths: str) -> list:
+        """Load the pickles concurrently; the file reads overlap on a cold page cache"""
+        # The pickles are stored uncompressed, so their numpy arrays can be memory-mapped
+        # read-only and shared through the page cache by every gunicorn worker
+        return Parallel(n_jobs=len(paths), prefer='threads')(
+            delayed(joblib.load)(path, mmap_mode='r') for path in paths)
+    
+    def _warm_up(self):
+        """Run a few throwaway predictions so lazy allocations happen at load, not on the first requests"""
+        if self.model is None:
+            return
+        dummy_row = (0.0,) * len(self._feature_order)
+        try:
+            for _ in range(5):
+                self._predict_features(dummy_row)
+        except Exception as e:
+            logger.warning("Cirrhosis model warm-up failed: %s", e)
+    
+    def _cache_scaler_statistics(self):
+        """Keep the StandardScaler statistics so complete rows can skip the sklearn transformers"""
+        imputer_is_noop = (isinstance(self.imputer, SimpleImputer)
+                           and isinstance(self.imputer.missing_values, float)
+                           and math.isnan(self.imputer.missing_values)
+                           and not self.imputer.add_indicator
+                           and not np.isnan(self.imputer.statistics_).any())  # no dropped columns
+        if not (imputer_is_noop and isinstance(self.scaler, StandardScaler)):
+            return
+        self._scaler_mean, self._scaler_scale = scaler_statistics(self.scaler)
     
-    def predict_risk(self, patient_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_lookups(self):
+        """Freeze the field mapping and feature order for the chosen model so predict_risk only reads them"""
+        if self.model_type == 'XGBoost':
+            field_mapping = self.field_mapping
+        else:
+            field_mapping = self.legacy_field_mapping
+        self._form_to_model_pairs = tuple(field_mapping.items())
+        # The rule-based fallback reads the legacy field names
+        self._feature_order = tuple(getattr(self, 'feature_names', self.legacy_feature_names))
+        form_fields = {model_field: form_field for form_field, model_field in self._form_to_model_pairs}
+        self._input_keys_ordered = tuple(form_fields[field] for field in self._feature_order)
+        self._gender_features = frozenset(name for name in self._feature_order if 'gender' in name.lower())
+        # Rebound on every load so results from a previous model are dropped
+        self._cached_predict = functools.lru_cache(maxsize=4096)(self._predict_features)
+    
+    def _predict_features(self, feature_values: Tuple[float, ...]) -> Tuple[float, int, str]:
+        """Run the trained model on one ordered feature vector"""
+        # Fresh 1-row array per call: the model instance is shared across request threads
+        features = np.array(feature_values, dtype=np.float64).reshape(1, -1)
+        
+        # Use trained model WITHOUT preprocessing for XGBoost
+        if self.model_type == 'XGBoost':
+            # XGBoost model - use raw data without scaling/imputation
+            if self.predictor is not None:
+                # Compiled trees return the class-1 probability directly
+                dmat = tl2cgen.DMatrix(features.astype(np.float32))
+                positive = float(np.ravel(self.predictor.predict(dmat))[0])
+                risk_probabilities = np.array([1 - positive, positive])
+                risk_class = int(positive > 0.5)
+            else:
+                # Predict straight from the array: no DMatrix, no sklearn wrapper
+                output = self._booster.inplace_predict(features, iteration_range=self._iteration_range)
+                positive = float(np.ravel(output)[-1])
+                risk_probabilities = np.array([1 - positive, positive])
+                risk_class = int(positive > 0.5)
+            risk_probability = risk_probabilities[1]  # Probability of cirrhosis (class 1)
+
+            model_type = f'Raw {self.model_type} Model (No Preprocessing)'
+            logger.debug("Cirrhosis Model - Raw XGBoost prediction: %s", risk_class)
+            logger.debug("Cirrhosis Model - Raw XGBoost probabilities: %s", risk_probabilities)
+            logger.debug("Cirrhosis Model - Final risk probability: %.2f%%", risk_probability * 100)
+
+        elif self.scaler is not None and self.imputer is not None:
+            # Legacy model - use preprocessing
+            if self._scaler_mean is not None and not np.isnan(features).any():
+                # Nothing to impute, so the pipeline reduces to StandardScaler's own arithmetic
+                X_scaled = standardize(features, self._scaler_mean, self._scaler_scale)
+            else:
+                X = pd.DataFrame(features, columns=self.feature_names)
+                X_imputed = self.imputer.transform(X)
+                X_scaled = self.scaler.transform(X_imputed)
+
+            # Make prediction
+            risk_probabilities = self.model.predict_proba(X_scaled)[0]
+            risk_class = self.model.predict(X_scaled)[0]
+            risk_probability = risk_probabilities[1]  # Probability of cirrhosis (class 1)
+
+            model_type = f'Enhanced {self.model_type} Trained Model'
+            logger.debug("Cirrhosis Model - Legacy prediction: %s", risk_class)
+            logger.debug("Cirrhosis Model - Legacy probabilities: %s", risk_probabilities)
+            logger.debug("Cirrhosis Model - Final risk probability: %.2f%%", risk_probability * 100)
+        else:
+            # Fallback if preprocessing tools missing
+            X = pd.DataFrame(features, columns=self.feature_names)
+            risk_probabilities = self.model.predict_proba(X)[0]
+            risk_class = self.model.predict(X)[0]
+            risk_probability = risk_probabilities[1]
+
+            model_type = f'Raw {self.model_type} Model'
+            logger.debug("Cirrhosis Model - Fallback prediction: %s", risk_class)
+            logger.debug("Cirrhosis Model - Fallback probabilities: %s", risk_probabilities)
+            logger.debug("Cirrhosis Model - Final risk probability: %.2f%%", risk_probability * 100)
+        
+        return risk_probability, risk_class, model_type
+    
+    def predict_risk(self, patient_data: Dict[str, Any], compute_scores: bool = True) -> Dict[str, Any]:
         """
         Predict cirrhosis risk for a patient using the enhanced model
         
         Args:
             patient_data: Dictionary with patient parameters
+            compute_scores: Set False to skip FIB-4/APRI/MELD (traditional_scores is then empty)
             
         Returns:
             Dictionary with prediction results
         """
         try:
-            # Map form fields to model features with proper conversion
-            mapped_data = {}
+            # Map form fields to model features (kept for the scores and interpretation)
+            # NO gender conversion for XGBoost model - use raw values as-is
+            # The dataset has gender values 0, 1, 2 and we'll use them directly
+            mapped_data = {model_field: patient_data[form_field]
+                           for form_field, model_field in self._form_to_model_pairs
+                           if form_field in patient_data}
             missing_fields = []
-            
-            # Use appropriate field mapping based on model type
-            if self.model_type == 'XGBoost':
-                field_mapping = self.field_mapping
-            else:
-                field_mapping = self.legacy_field_mapping
-            
-            for form_field, model_field in field_mapping.items():
-                if form_field in patient_data:
-                    value = patient_data[form_field]
-                    
-                    # NO gender conversion for XGBoost model - use raw values as-is
-                    # The dataset has gender values 0, 1, 2 and we'll use them directly
-                    
-                    mapped_data[model_field] = value
-                else:
-                    missing_fields.append(form_field)
-            
-            print(f"📊 Cirrhosis Model ({self.model_type}) - Mapped feature data:")
-            for field in self.feature_names:
-                if field in mapped_data:
-                    value = mapped_data[field]
-                    if 'gender' in field.lower():
-                        print(f"  {field}: {value} (raw dataset value - no conversion)")
+            if len(mapped_data) < len(self._form_to_model_pairs):
+                missing_fields = [form_field for form_field, _ in self._form_to_model_pairs
+                                  if form_field not in patient_data]
+            
+            # Only format the per-field dump when someone is reading it
+            if logger.isEnabledFor(logging.DEBUG):
+                lines = []
+                for field in self._feature_order:
+                    if field not in mapped_data:
+                        lines.append(f"  {field}: MISSING")
+                    elif field in self._gender_features:
+                        lines.append(f"  {field}: {mapped_data[field]} (raw dataset value - no conversion)")
                     else:
-                        print(f"  {field}: {value}")
-                else:
-                    print(f"  {field}: MISSING")
+                        lines.append(f"  {field}: {mapped_data[field]}")
+                logger.debug("Cirrhosis Model (%s) - Mapped feature data:\n%s", self.model_type, "\n".join(lines))
             
             # Raise error if any required fields are missing
             if missing_fields:
                 raise ValueError(f"Missing required fields for Cirrhosis prediction: {', '.join(set(missing_fields))}")
             
-            # Prepare features in the correct order
-            features = []
-            for field in self.feature_names:
-                value = float(mapped_data[field])
-                features.append(value)
-            
-            print(f"🔢 Cirrhosis Model - Feature vector: {features}")
+            # Prepare features in the correct order, read straight from the form
+            feature_values = tuple(float(patient_data[form_field]) for form_field in self._input_keys_ordered)
             
-            # Convert to DataFrame for consistent processing
-            X = pd.DataFrame([features], columns=self.feature_names)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Cirrhosis Model - Feature vector: %s", list(feature_values))
             
             if self.model is not None:
-                # Use trained model WITHOUT preprocessing for XGBoost
-                if self.model_type == 'XGBoost':
-                    # XGBoost model - use raw data without scaling/imputation
-                    risk_probabilities = self.model.predict_proba(X)[0]
-                    risk_class = self.model.predict(X)[0]
-                    risk_probability = risk_probabilities[1]  # Probability of cirrhosis (class 1)
-                    
-                    model_type = f'Raw {self.model_type} Model (No Preprocessing)'
-                    print(f"🎯 Cirrhosis Model - Raw XGBoost prediction: {risk_class}")
-                    print(f"🎯 Cirrhosis Model - Raw XGBoost probabilities: {risk_probabilities}")
-                    print(f"✅ Cirrhosis Model - Final risk probability: {risk_probability*100:.2f}%")
-                    
-                elif self.scaler is not None and self.imputer is not None:
-                    # Legacy model - use preprocessing
-                    X_imputed = self.imputer.transform(X)
-                    X_scaled = self.scaler.transform(X_imputed)
-                    
-                    # Make prediction
-                    risk_probabilities = self.model.predict_proba(X_scaled)[0]
-                    risk_class = self.model.predict(X_scaled)[0]
-                    risk_probability = risk_probabilities[1]  # Probability of cirrhosis (class 1)
-                    
-                    model_type = f'Enhanced {self.model_type} Trained Model'
-                    print(f"🎯 Cirrhosis Model - Legacy prediction: {risk_class}")
-                    print(f"🎯 Cirrhosis Model - Legacy probabilities: {risk_probabilities}")
-                    print(f"✅ Cirrhosis Model - Final risk probability: {risk_probability*100:.2f}%")
+                # Resubmitted forms (reloads, retries) reuse the earlier result;
+                # NaN never equals itself, so those inputs skip the cache
+                if any(map(math.isnan, feature_values)):
+                    risk_probability, risk_class, model_type = self._predict_features(feature_values)
                 else:
-                    # Fallback if preprocessing tools missing
-                    risk_probabilities = self.model.predict_proba(X)[0]
-                    risk_class = self.model.predict(X)[0]
-                    risk_probability = risk_probabilities[1]
-                    
-                    model_type = f'Raw {self.model_type} Model'
-                    print(f"🎯 Cirrhosis Model - Fallback prediction: {risk_class}")
-                    print(f"🎯 Cirrhosis Model - Fallback probabilities: {risk_probabilities}")
-                    print(f"✅ Cirrhosis Model - Final risk probability: {risk_probability*100:.2f}%")
+                    risk_probability, risk_class, model_type = self._cached_predict(feature_values)
                 
             else:
                 # Enhanced rule-based prediction with better scoring
@@ -216,21 +343,13 @@ class CirrhosisRiskModel:
                 model_type = 'Enhanced Rule-based Calculation'
             
             # Calculate traditional scores
-            traditional_scores = self._calculate_traditional_scores(mapped_data)
+            traditional_scores = self._calculate_traditional_scores(mapped_data) if compute_scores else {}
             
             # Determine risk level and color
-            if risk_probability < 0.3:
-                risk_level = "Low"
-                risk_color = "success"
-            elif risk_probability < 0.7:
-                risk_level = "Moderate"
-                risk_color = "warning"
-            else:
-                risk_level = "High"
-                risk_color = "danger"
+            risk_level, risk_color = _RISK_LEVELS[bisect.bisect_right(_RISK_THRESHOLDS, risk_probability)]
             
             # Generate interpretation
-            interpretation = self._generate_interpretation(mapped_data, traditional_scores, risk_probability)
+            interpretation = self._generate_interpretation(mapped_data, traditional_scores, risk_level)
             
             return {
                 'disease': 'Cirrhosis',
@@ -246,7 +365,7 @@ class CirrhosisRiskModel:
             }
             
         except Exception as e:
-            print(f"❌ Error in cirrhosis prediction: {e}")
+            logger.error("Error in cirrhosis prediction: %s", e)
             return {
                 'disease': 'Cirrhosis',
                 'risk_probability': 0.5,
@@ -260,6 +379,75 @@ class CirrhosisRiskModel:
                 'confidence': 0.0
             }
     
+    def predict_risk_batch(self, patient_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Predict cirrhosis risk for many patients at once (cohort / CSV scoring)
+        
+        Args:
+            patient_df: One row per patient, columns named like the form fields
+            
+        Returns:
+            DataFrame indexed like patient_df with the risk columns and FIB-4/APRI/MELD
+        """
+        form_fields = [form_field for form_field, _ in self._form_to_model_pairs]
+        missing_fields = [field for field in form_fields if field not in patient_df.columns]
+        if missing_fields:
+            raise ValueError(f"Missing required fields for Cirrhosis prediction: {', '.join(missing_fields)}")
+        
+        if self.model_type == 'XGBoost':
+            # One model call for the whole frame instead of one per row
+            features = (patient_df[form_fields]
+                        .rename(columns=dict(self._form_to_model_pairs))
+                        .reindex(columns=list(self._feature_order))
+                        .to_numpy(dtype=np.float32))
+            if self.predictor is not None:
+                output = self.predictor.predict(tl2cgen.DMatrix(features))
+            else:
+                output = self._booster.inplace_predict(features, iteration_range=self._iteration_range)
+            risk_probability = np.asarray(output, dtype=np.float64).reshape(len(features), -1)[:, -1]
+            model_type = f'Raw {self.model_type} Model (No Preprocessing)'
+        else:
+            # Legacy and rule-based models keep their per-row preprocessing
+            # (scores are computed column-wise below)
+            results = [self.predict_risk(row, compute_scores=False) for row in patient_df[form_fields].to_dict('records')]
+            risk_probability = np.array([result['risk_probability'] for result in results], dtype=np.float64)
+            model_type = results[0]['model_type'] if results else self.model_type
+        
+        level_index = np.searchsorted(_RISK_THRESHOLDS, risk_probability, side='right')
+        levels = np.array(_RISK_LEVELS, dtype=object)[level_index]
+        
+        return pd.DataFrame({
+            'risk_probability': risk_probability,
+            'risk_percentage': risk_probability * 100,
+            'risk_class': (risk_probability > 0.5).astype(int),
+            'risk_level': levels[:, 0],
+            'risk_color': levels[:, 1],
+            'confidence': np.abs(risk_probability - 0.5) * 2,
+            'model_type': model_type,
+            **self._calculate_traditional_scores_batch(patient_df),
+        }, index=patient_df.index)
+    
+    @staticmethod
+    def _calculate_traditional_scores_batch(patient_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Columnar FIB-4, APRI and MELD from the form fields (NaN where a score is undefined)"""
+        age, ast, alt, platelet, inr, total_bil, creatinine = (
+            patient_df[field].to_numpy(dtype=np.float64)
+            for field in ('age', 'ast', 'alt', 'trombosit', 'inr', 'total_bilirubin', 'creatinine'))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fib4 = np.where((platelet > 0) & (alt > 0), (age * ast) / (platelet * np.sqrt(alt)), np.nan)
+            apri = np.where(platelet > 0, (ast / 40) / (platelet / 1000) * 100, np.nan)
+            # MELD convention: lab values below 1.0 are set to 1.0
+            meld = (3.78 * np.log(np.maximum(total_bil, 1.0)) + 11.2 * np.log(np.maximum(inr, 1.0))
+                    + 9.57 * np.log(np.maximum(creatinine, 1.0)) + 6.43)
+        meld = np.clip(meld, 6, 40)  # MELD score range 6-40; missing labs stay NaN
+        
+        return {
+            'FIB-4': np.round(fib4, 2),
+            'APRI': np.round(apri, 2),
+            'MELD': np.round(meld, 1),
+        }
+    
     def _enhanced_rule_based_prediction(self, data: Dict[str, Any]) -> Tuple[float, int]:
         """
         Enhanced rule-based prediction when trained model is not available
@@ -299,79 +487,23 @@ class CirrhosisRiskModel:
             if missing_fields:
                 raise ValueError(f"Missing required fields for rule-based prediction: {', '.join(missing_fields)}")
             
-            # Key indicators for cirrhosis risk
-            risk_score = 0.0
-            
-            # Age factor (higher risk with age, especially > 50)
-            age = data[age_field]
-            if age > 60:
-                risk_score += 0.15
-            elif age > 50:
-                risk_score += 0.10
-            elif age > 40:
-                risk_score += 0.05
-            
-            # AST/ALT ratio (>1 suggests cirrhosis)
-            ast = data[ast_field]
+            # Key indicators for cirrhosis risk, in _RISK_RULES order
             alt = data[alt_field]
-            if alt > 0:
-                ast_alt_ratio = ast / alt
-                if ast_alt_ratio > 2:
-                    risk_score += 0.20
-                elif ast_alt_ratio > 1.5:
-                    risk_score += 0.15
-                elif ast_alt_ratio > 1:
-                    risk_score += 0.10
-            
-            # Platelet count (thrombocytopenia indicates portal hypertension)
-            platelet = data[platelet_field]
-            if platelet < 100:
-                risk_score += 0.25
-            elif platelet < 150:
-                risk_score += 0.15
-            elif platelet < 200:
-                risk_score += 0.10
-            
-            # Albumin (hypoalbuminemia indicates liver dysfunction)
-            albumin = data[albumin_field]
-            if albumin < 3.0:
-                risk_score += 0.20
-            elif albumin < 3.5:
-                risk_score += 0.15
-            elif albumin < 4.0:
-                risk_score += 0.10
-            
-            # INR (coagulopathy indicates liver dysfunction)
-            inr = data[inr_field]
-            if inr > 1.5:
-                risk_score += 0.20
-            elif inr > 1.3:
-                risk_score += 0.15
-            elif inr > 1.1:
-                risk_score += 0.10
-            
-            # Total bilirubin (hyperbilirubinemia)
-            total_bil = data[total_bil_field]
-            if total_bil > 2.0:
-                risk_score += 0.15
-            elif total_bil > 1.5:
-                risk_score += 0.10
-            elif total_bil > 1.2:
-                risk_score += 0.05
-            
-            # BMI (obesity can worsen liver disease) - optional field
-            bmi = data.get(bmi_field, 25)  # BMI can have default as it's often calculated
-            if bmi > 35:
-                risk_score += 0.10
-            elif bmi > 30:
-                risk_score += 0.05
-            
-            # ALP elevation - optional field
-            alp = data.get(alp_field, 100)  # ALP can have default as it's supplementary
-            if alp > 200:
-                risk_score += 0.10
-            elif alp > 150:
-                risk_score += 0.05
+            values = (
+                data[age_field],
+                data[ast_field] / alt if alt > 0 else None,  # AST/ALT ratio needs ALT > 0
+                data[platelet_field],
+                data[albumin_field],
+                data[inr_field],
+                data[total_bil_field],
+                data.get(bmi_field, 25),  # BMI can have default as it's often calculated
+                data.get(alp_field, 100),  # ALP can have default as it's supplementary
+            )
+            
+            risk_score = 0.0
+            for value, (locate, thresholds, weights) in zip(values, _RISK_RULES):
+                if value is not None:
+                    risk_score += weights[locate(thresholds, value)]
             
             # Normalize to probability (0-1)
             risk_probability = min(risk_score, 0.95)  # Cap at 95%
@@ -380,12 +512,12 @@ class CirrhosisRiskModel:
             # Determine class
             risk_class = 1 if risk_probability > 0.5 else 0
             
-            print(f"🧮 Enhanced rule-based cirrhosis risk calculation: {risk_probability:.3f}")
+            logger.debug("Enhanced rule-based cirrhosis risk calculation: %.3f", risk_probability)
             
             return risk_probability, risk_class
             
         except Exception as e:
-            print(f"❌ Error in enhanced rule-based prediction: {e}")
+            logger.error("Error in enhanced rule-based prediction: %s", e)
             return 0.5, 0
     
     def _calculate_traditional_scores(self, mapped_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -406,7 +538,7 @@ class CirrhosisRiskModel:
                 platelet = mapped_data['Trombosit']
                 
                 if platelet > 0 and alt > 0:
-                    fib4 = (age * ast) / (platelet * (alt ** 0.5))
+                    fib4 = (age * ast) / (platelet * math.sqrt(alt))
                     scores['FIB-4'] = round(fib4, 2)
                     
                     if fib4 < 1.45:
@@ -444,7 +576,9 @@ class CirrhosisRiskModel:
                 total_bil = mapped_data['Total Bilirubin']
                 creatinine = mapped_data['Creatinine']
                 
-                meld = 3.78 * np.log(total_bil) + 11.2 * np.log(inr) + 9.57 * np.log(creatinine) + 6.43
+                # MELD convention: lab values below 1.0 are set to 1.0 (also keeps log in its domain)
+                meld = (3.78 * math.log(max(total_bil, 1.0)) + 11.2 * math.log(max(inr, 1.0))
+                        + 9.57 * math.log(max(creatinine, 1.0)) + 6.43)
                 meld = max(6, min(40, meld))  # MELD score range 6-40
                 scores['MELD'] = round(meld, 1)
                 
@@ -461,25 +595,18 @@ class CirrhosisRiskModel:
                 scores['MELD Error'] = f"Missing fields: {', '.join(missing_meld)}"
                 
         except Exception as e:
-            print(f"⚠️ Error calculating traditional scores: {e}")
+            logger.warning("Error calculating traditional scores: %s", e)
             scores['Error'] = str(e)
         
         return scores
     
     def _generate_interpretation(self, mapped_data: Dict[str, Any], 
                                 traditional_scores: Dict[str, Any], 
-                                risk_probability: float) -> str:
+                                risk_level: str) -> str:
         """Generate clinical interpretation"""
         try:
-            interpretation = []
-            
             # Risk level interpretation
-            if risk_probability < 0.3:
-                interpretation.append("Low cirrhosis risk based on current laboratory values.")
-            elif risk_probability < 0.7:
-                interpretation.append("Moderate cirrhosis risk detected. Enhanced monitoring recommended.")
-            else:
-                interpretation.append("High cirrhosis risk indicated. Immediate clinical evaluation advised.")
+            interpretation = [_RISK_SUMMARIES[risk_level]]
             
             # Key findings - only analyze if fields are present
             findings = []
@@ -515,66 +642,17 @@ class CirrhosisRiskModel:
                 interpretation.append("Key findings: " + "; ".join(findings))
             
             # Traditional scores summary
-            if 'FIB-4' in traditional_scores:
-                interpretation.append(f"FIB-4 score: {traditional_scores['FIB-4']} - {traditional_scores.get('FIB-4 Interpretation', '')}")
+            for score in ('FIB-4', 'APRI', 'MELD'):
+                if score in traditional_scores:
+                    interpretation.append(f"{score} score: {traditional_scores[score]} - {traditional_scores.get(f'{score} Interpretation', '')}")
+            
+            # Risk-based recommendations
+            interpretation.append(_RISK_RECOMMENDATIONS[risk_level])
             
             return " ".join(interpretation)
             
         except Exception as e:
             return f"Error generating interpretation: {str(e)}"
-        
-        # Platelet assessment
-        platelets = float(mapped_data['Trombosit'])
-        if platelets < 100:
-            interpretation.append("Thrombocytopenia may indicate portal hypertension.")
-        elif platelets < 150:
-            interpretation.append("Mild thrombocytopenia noted.")
-        
-        # Albumin assessment
-        albumin = float(mapped_data['Albumin'])
-        if albumin < 3.0:
-            interpretation.append("Low albumin suggests impaired hepatic synthetic function.")
-        elif albumin < 3.5:
-            interpretation.append("Mild hypoalbuminemia noted.")
-        
-        # INR assessment
-        inr = float(mapped_data['INR'])
-        if inr > 1.5:
-            interpretation.append("Elevated INR indicates coagulopathy.")
-        elif inr > 1.2:
-            interpretation.append("Mild coagulopathy noted.")
-        
-        # Traditional score interpretation
-        if 'FIB-4' in traditional_scores:
-            fib4 = traditional_scores['FIB-4']
-            if fib4 < 1.45:
-                interpretation.append("FIB-4 <1.45 suggests low probability of advanced fibrosis.")
-            elif fib4 > 3.25:
-                interpretation.append("FIB-4 >3.25 suggests high probability of advanced fibrosis.")
-        
-        if 'APRI' in traditional_scores:
-            apri = traditional_scores['APRI']
-            if apri < 0.5:
-                interpretation.append("APRI <0.5 suggests low probability of significant fibrosis.")
-            elif apri > 1.5:
-                interpretation.append("APRI >1.5 suggests high probability of significant fibrosis.")
-        
-        if 'MELD' in traditional_scores:
-            meld = traditional_scores['MELD']
-            if meld < 10:
-                interpretation.append("MELD <10 indicates low short-term mortality risk.")
-            elif meld > 15:
-                interpretation.append("MELD >15 indicates increased short-term mortality risk.")
-        
-        # Risk-based recommendations
-        if risk_probability > 0.7:
-            interpretation.append("High risk warrants urgent hepatology consultation.")
-        elif risk_probability > 0.3:
-            interpretation.append("Moderate risk - consider hepatology referral and regular monitoring.")
-        else:
-            interpretation.append("Low risk - routine monitoring and lifestyle modifications advised.")
-        
-        return " ".join(interpretation)
     
     def get_feature_importance(self) -> Dict[str, float]:
         """Get feature importance if model is available"""
@@ -583,8 +661,40 @@ class CirrhosisRiskModel:
         return {}
 
 
+def export_compiled_model(parallel_comp: int = 8) -> str:
+    """Compile the XGBoost cirrhosis model to a shared library for tl2cgen (run at packaging time)"""
+    import treelite
+    
+    model = CirrhosisRiskModel()
+    if model.model_type != 'XGBoost':
+        raise RuntimeError("XGBoost cirrhosis model not available to compile")
+    trees = treelite.frontend.from_xgboost(model.model.get_booster())
+    tl2cgen.export_lib(trees, toolchain='gcc', libpath=model.compiled_model_path,
+                       params={'parallel_comp': parallel_comp})
+    return model.compiled_model_path
+
+
+# Shared model instance, loaded once per process on first prediction
+_MODEL_SINGLETON = None
+_MODEL_LOCK = threading.Lock()
+
+
+def _get_model() -> CirrhosisRiskModel:
+    """Return the process-wide model, loading the pickles on first use"""
+    global _MODEL_SINGLETON
+    if _MODEL_SINGLETON is None:
+        with _MODEL_LOCK:
+            if _MODEL_SINGLETON is None:
+                _MODEL_SINGLETON = CirrhosisRiskModel()
+    return _MODEL_SINGLETON
+
+
 # Convenience function for easy import
-def predict_cirrhosis_risk(patient_data: Dict[str, Any]) -> Dict[str, Any]:
+def predict_cirrhosis_risk(patient_data: Dict[str, Any], compute_scores: bool = True) -> Dict[str, Any]:
     """Convenience function to predict cirrhosis risk"""
-    model = CirrhosisRiskModel()
-    return model.predict_risk(patient_data)
+    return _get_model().predict_risk(patient_data, compute_scores=compute_scores)
+
+
+def predict_cirrhosis_risk_batch(patient_df: pd.DataFrame) -> pd.DataFrame:
+    """Convenience function to predict cirrhosis risk for a DataFrame of patients"""
+    return _get_model().predict_risk_batch(patient_df)
@@ -4,12 +4,74 @@ Exactly replicating the training preprocessing from nihai_hcc.py
 """
 
 import numpy as np
-import pandas as pd
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Tuple
+import bisect
 import joblib
+import logging
+import math
+import operator
 import os
+import threading
 from sklearn.preprocessing import StandardScaler
 
+from ._scaling import scaler_statistics, standardize
+
+logger = logging.getLogger(__name__)
+
+
+# Interpretation findings: (feature, default, comparison, threshold, message).
+# 'Peak enzyme' is max(AST, ALT), so one row covers "AST > 80 or ALT > 80".
+_FINDING_CHECKS = (
+    ('Age', 0, operator.gt, 60, "Advanced age increases HCC risk."),
+    ('Gender', 1, operator.eq, 2, "Male gender is associated with higher HCC risk."),  # 2 = Male
+    ('Peak enzyme', 0, operator.gt, 80, "Significantly elevated liver enzymes suggest hepatocellular injury."),
+    ('Trombosit', 0, operator.lt, 150000, "Thrombocytopenia may indicate advanced liver disease."),
+)
+
+# AFP bands (value > threshold) and the message for each
+_AFP_THRESHOLDS = (20, 200, 400)
+_AFP_MESSAGES = (
+    None,
+    "Mildly elevated AFP warrants monitoring.",
+    "Elevated AFP is concerning for HCC.",
+    "Very high AFP strongly suggests HCC.",
+)
+
+# Recommendation per risk band (probability > 0.3 moderate, > 0.7 high)
+_RISK_THRESHOLDS = (0.3, 0.7)
+_RISK_RECOMMENDATIONS = (
+    "Low risk but continue surveillance if risk factors present.",
+    "Moderate risk requires close monitoring and follow-up.",
+    "High risk warrants immediate hepatology evaluation and imaging.",
+)
+
+
+# These are the exact columns from the training script
+_CATEGORICAL_COLS = ('Gender', 'Obesity')
+_ALL_FEATURE_NAMES = (
+    'Age', 'Gender', 'AST', 'ALT', 'Albumin', 'Creatinine', 'INR', 
+    'Trombosit', 'Total_Bil', 'Dir_Bil', 'Obesity', 'ALP', 'AFP'
+)
+# Numerical columns are all except categorical
+_NUMERICAL_COLS = tuple(col for col in _ALL_FEATURE_NAMES if col not in _CATEGORICAL_COLS)
+
+# Form field mapping to dataset column names: (form field, dataset column)
+_FIELD_MAPPING = (
+    ('age', 'Age'),
+    ('gender', 'Gender'),
+    ('ast', 'AST'),
+    ('alt', 'ALT'),
+    ('albumin', 'Albumin'),
+    ('creatinine', 'Creatinine'),
+    ('inr', 'INR'),
+    ('trombosit', 'Trombosit'),
+    ('total_bilirubin', 'Total_Bil'),
+    ('direct_bilirubin', 'Dir_Bil'),
+    ('obesity', 'Obesity'),
+    ('alp', 'ALP'),
+    ('afp', 'AFP'),
+)
+
 
 class HCCRiskModelFinal:
     def __init__(self):
@@ -18,32 +80,26 @@ class HCCRiskModelFinal:
         
         self.model = None
         self.scaler = None
+        self._scaler_mean = None
+        self._scaler_scale = None
         
         # These are the exact columns from the training script
-        self.categorical_cols = ['Gender', 'Obesity']
-        self.all_feature_names = [
-            'Age', 'Gender', 'AST', 'ALT', 'Albumin', 'Creatinine', 'INR', 
-            'Trombosit', 'Total_Bil', 'Dir_Bil', 'Obesity', 'ALP', 'AFP'
-        ]
-        # Numerical columns are all except categorical
-        self.numerical_cols = [col for col in self.all_feature_names if col not in self.categorical_cols]
+        self.categorical_cols = list(_CATEGORICAL_COLS)
+        self.all_feature_names = list(_ALL_FEATURE_NAMES)
+        self.numerical_cols = list(_NUMERICAL_COLS)
         
         # Form field mapping to dataset column names
-        self.field_mapping = {
-            'age': 'Age',
-            'gender': 'Gender',
-            'ast': 'AST',
-            'alt': 'ALT',
-            'albumin': 'Albumin',
-            'creatinine': 'Creatinine',
-            'inr': 'INR',
-            'trombosit': 'Trombosit',
-            'total_bilirubin': 'Total_Bil',
-            'direct_bilirubin': 'Dir_Bil',
-            'obesity': 'Obesity',
-            'alp': 'ALP',
-            'afp': 'AFP'
-        }
+        self.field_mapping = dict(_FIELD_MAPPING)
+        
+        # Optional inputs and the value used when the form leaves them out
+        self.optional_defaults = {'AFP': 0.0, 'Obesity': 0}
+        
+        # Column positions in the model row, resolved once instead of per prediction
+        self._num_idx = np.array([self.all_feature_names.index(col) for col in self.numerical_cols])
+        self._input_columns = tuple(
+            (form_field, dataset_col, self.all_feature_names.index(dataset_col))
+            for form_field, dataset_col in self.field_mapping.items()
+        )
         
         self.load_model()
     
@@ -53,26 +109,43 @@ class HCCRiskModelFinal:
             # Load the trained SVM model
             if os.path.exists(self.model_path):
                 self.model = joblib.load(self.model_path)
-                print(f"✅ HCC SVM model loaded successfully")
+                logger.info("HCC SVM model loaded successfully")
             else:
-                print(f"❌ Model file not found: {self.model_path}")
+                logger.error("Model file not found: %s", self.model_path)
                 return
                 
             # Load the exact scaler used during training
             if os.path.exists(self.scaler_path):
                 self.scaler = joblib.load(self.scaler_path)
-                print(f"✅ HCC StandardScaler loaded successfully")
+                logger.info("HCC StandardScaler loaded successfully")
             else:
-                print(f"❌ Scaler file not found: {self.scaler_path}")
+                logger.error("Scaler file not found: %s", self.scaler_path)
                 return
                 
-            print("✅ HCC model ready for predictions")
+            # Names are checked once here; predictions then pass plain arrays in this column order
+            self._drop_feature_names(self.model, self.all_feature_names)
+            self._drop_feature_names(self.scaler, self.numerical_cols)
+            
+            # StandardScaler statistics, so a prediction skips sklearn's per-call validation
+            self._scaler_mean, self._scaler_scale = scaler_statistics(self.scaler)
+            
+            logger.info("HCC model ready for predictions")
             
         except Exception as e:
-            print(f"❌ Error loading HCC model: {e}")
+            logger.error("Error loading HCC model: %s", e)
             self.model = None
             self.scaler = None
     
+    @staticmethod
+    def _drop_feature_names(estimator, expected_names):
+        """Verify the fitted column order, then stop sklearn re-checking names on every ndarray call"""
+        fitted_names = getattr(estimator, 'feature_names_in_', None)
+        if fitted_names is None:
+            return
+        if list(fitted_names) != list(expected_names):
+            raise ValueError(f"Unexpected feature order in {type(estimator).__name__}: {list(fitted_names)}")
+        del estimator.feature_names_in_
+    
     def predict_risk(self, patient_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Predict HCC risk using the exact same preprocessing as training
@@ -81,108 +154,151 @@ class HCCRiskModelFinal:
             if self.model is None or self.scaler is None:
                 raise Exception("Model or scaler not loaded properly")
             
-            # Map form fields to dataset column names and prepare features
-            features = {}
-            missing_fields = []
-            
-            for form_field, dataset_col in self.field_mapping.items():
-                if form_field in patient_data:
-                    value = patient_data[form_field]
-                    # Special handling for Trombosit - multiply by 1000 for HCC model
-                    if dataset_col == 'Trombosit':
-                        value = float(value) * 1000
-                    features[dataset_col] = value
-                else:
-                    # Only allow certain fields to be missing with defaults
-                    if dataset_col == 'AFP':
-                        # AFP is optional, default to 0 if not provided
-                        features[dataset_col] = 0.0
-                    elif dataset_col == 'Obesity':
-                        # Obesity is optional, default to 0 (not obese) if not provided
-                        features[dataset_col] = 0
-                    else:
-                        # All other fields are required
-                        missing_fields.append(form_field)
-            
-            print("📊 HCC Model - Mapped feature data:")
-            for dataset_col in self.all_feature_names:
-                if dataset_col in features:
-                    value = features[dataset_col]
-                    print(f"  {dataset_col}: {value}")
-                else:
-                    print(f"  {dataset_col}: MISSING")
+            x = np.empty((1, len(self.all_feature_names)), dtype=np.float64)
+            features = self._fill_row(patient_data, x[0])
             
-            # Raise error if any required fields are missing
-            if missing_fields:
-                raise ValueError(f"Missing required fields for HCC prediction: {', '.join(missing_fields)}")
+            # Make prediction: one kernel pass, class label taken from the same probabilities
+            probabilities = self.model.predict_proba(self._standardize(x))[0]
+            return self._build_result(patient_data, features, probabilities)
             
-            # Create DataFrame with single row (exactly like training)
-            df = pd.DataFrame([features])
-            
-            # Ensure all columns are present and in correct order
-            for col in self.all_feature_names:
-                if col not in df.columns:
-                    df[col] = 0
-            
-            df = df[self.all_feature_names]
-            
-            # Apply the exact same preprocessing as training:
-            # 1. Keep categorical columns as-is
-            # 2. Standardize numerical columns using the fitted scaler
-            
-            X_processed = df.copy()
-            
-            # Apply standardization to numerical columns only (exactly like training)
-            X_processed[self.numerical_cols] = self.scaler.transform(df[self.numerical_cols])
-            
-            # Make prediction
-            risk_probability = 1- self.model.predict_proba(X_processed)[0][1]
-            risk_class = self.model.predict(X_processed)[0]
-            
-            # Calculate traditional scores for interpretation
-            traditional_scores = self._calculate_traditional_scores(features)
+        except Exception as e:
+            return self._error_result(e)
+    
+    def predict_risk_batch(self, patients: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Predict HCC risk for many patients with one standardization and one SVM call
+        
+        Args:
+            patients: Patient dictionaries, as accepted by predict_risk
             
-            # Determine risk level
-            if risk_probability < 0.3:
-                risk_level = "Low"
-                risk_color = "success"
-            elif risk_probability < 0.7:
-                risk_level = "Moderate"
-                risk_color = "warning"
+        Returns:
+            One result dictionary per patient, in input order (error results for rows that fail)
+        """
+        if self.model is None or self.scaler is None:
+            return [self._error_result(Exception("Model or scaler not loaded properly")) for _ in patients]
+        
+        X = np.empty((len(patients), len(self.all_feature_names)), dtype=np.float64)
+        results = [None] * len(patients)
+        valid_rows = []
+        row_features = []
+        for i, patient_data in enumerate(patients):
+            try:
+                row_features.append(self._fill_row(patient_data, X[i]))
+                valid_rows.append(i)
+            except Exception as e:
+                results[i] = self._error_result(e)
+        
+        if valid_rows:
+            try:
+                probabilities = self.model.predict_proba(self._standardize(X[valid_rows]))
+            except Exception as e:
+                for i in valid_rows:
+                    results[i] = self._error_result(e)
             else:
-                risk_level = "High"
-                risk_color = "danger"
-            
-            # Generate interpretation
-            interpretation = self._generate_interpretation(features, traditional_scores, risk_probability)
-            
-            return {
-                'disease': 'HCC (Hepatocellular Carcinoma)',
-                'risk_probability': risk_probability,
-                'risk_percentage': risk_probability * 100,
-                'risk_class': risk_class,
-                'risk_level': risk_level,
-                'risk_color': risk_color,
-                'traditional_scores': traditional_scores,
-                'model_type': 'SVM Trained Model (Standardized)',
-                'interpretation': interpretation,
-                'has_afp': 'afp' in patient_data and patient_data['afp'] is not None and patient_data['afp'] > 0
-            }
-            
-        except Exception as e:
-            return {
-                'disease': 'HCC (Hepatocellular Carcinoma)',
-                'error': str(e),
-                'risk_probability': 0.0,
-                'risk_percentage': 0.0,
-                'risk_class': 0,
-                'risk_level': 'Error',
-                'risk_color': 'secondary',
-                'traditional_scores': {},
-                'model_type': 'Error',
-                'interpretation': f'Error in calculation: {str(e)}',
-                'has_afp': False
-            }
+                for i, features, row_probabilities in zip(valid_rows, row_features, probabilities):
+                    try:
+                        results[i] = self._build_result(patients[i], features, row_probabilities)
+                    except Exception as e:
+                        results[i] = self._error_result(e)
+        
+        return results
+    
+    def _fill_row(self, patient_data: Dict[str, Any], row: np.ndarray) -> Dict[str, Any]:
+        """Write one patient into a model row (column order); returns the mapped features"""
+        # Map form fields to dataset column names and fill the model row in column order
+        features = {}
+        missing_fields = []
+        
+        for form_field, dataset_col, col_idx in self._input_columns:
+            if form_field in patient_data:
+                # Convert once here; the scores and interpretation then work on floats
+                value = float(patient_data[form_field])
+                # Special handling for Trombosit - multiply by 1000 for HCC model
+                if dataset_col == 'Trombosit':
+                    value *= 1000
+            elif dataset_col in self.optional_defaults:
+                # AFP (0.0) and Obesity (0, not obese) are optional
+                value = float(self.optional_defaults[dataset_col])
+            else:
+                # All other fields are required
+                missing_fields.append(form_field)
+                continue
+            features[dataset_col] = value
+            row[col_idx] = value
+        
+        # Only format the per-field dump when someone is reading it
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("HCC Model - Mapped feature data:\n%s", "\n".join(
+                f"  {dataset_col}: {features[dataset_col]}" if dataset_col in features else f"  {dataset_col}: MISSING"
+                for dataset_col in self.all_feature_names))
+        
+        # Raise error if any required fields are missing
+        if missing_fields:
+            raise ValueError(f"Missing required fields for HCC prediction: {', '.join(missing_fields)}")
+        
+        return features
+    
+    def _standardize(self, X: np.ndarray) -> np.ndarray:
+        """
+        Apply the exact same preprocessing as training, in place:
+        1. Keep categorical columns as-is
+        2. Standardize numerical columns using the fitted scaler
+        """
+        X[:, self._num_idx] = standardize(X[:, self._num_idx], self._scaler_mean, self._scaler_scale)
+        return X
+    
+    def _build_result(self, patient_data: Dict[str, Any], features: Dict[str, Any],
+                      probabilities: np.ndarray) -> Dict[str, Any]:
+        """Turn one row of SVM probabilities into the prediction response"""
+        risk_probability = 1 - probabilities[1]
+        risk_class = self.model.classes_[int(np.argmax(probabilities))]
+        
+        # Calculate traditional scores for interpretation
+        traditional_scores = self._calculate_traditional_scores(features)
+        
+        # Determine risk level
+        if risk_probability < 0.3:
+            risk_level = "Low"
+            risk_color = "success"
+        elif risk_probability < 0.7:
+            risk_level = "Moderate"
+            risk_color = "warning"
+        else:
+            risk_level = "High"
+            risk_color = "danger"
+        
+        # Generate interpretation
+        interpretation = self._generate_interpretation(features, traditional_scores, risk_probability)
+        
+        return {
+            'disease': 'HCC (Hepatocellular Carcinoma)',
+            'risk_probability': risk_probability,
+            'risk_percentage': risk_probability * 100,
+            'risk_class': risk_class,
+            'risk_level': risk_level,
+            'risk_color': risk_color,
+            'traditional_scores': traditional_scores,
+            'model_type': 'SVM Trained Model (Standardized)',
+            'interpretation': interpretation,
+            'has_afp': 'afp' in patient_data and patient_data['afp'] is not None and patient_data['afp'] > 0
+        }
+    
+    @staticmethod
+    def _error_result(e: Exception) -> Dict[str, Any]:
+        """Response returned when a prediction fails"""
+        return {
+            'disease': 'HCC (Hepatocellular Carcinoma)',
+            'error': str(e),
+            'risk_probability': 0.0,
+            'risk_percentage': 0.0,
+            'risk_class': 0,
+            'risk_level': 'Error',
+            'risk_color': 'secondary',
+            'traditional_scores': {},
+            'model_type': 'Error',
+            'interpretation': f'Error in calculation: {str(e)}',
+            'has_afp': False
+        }
     
     def _calculate_traditional_scores(self, features: Dict[str, Any]) -> Dict[str, float]:
         """Calculate traditional HCC-related scores"""
@@ -196,7 +312,7 @@ class HCCRiskModelFinal:
             platelets = features.get('Trombosit', 0)  # Already scaled by 1000
             
             if platelets > 0 and alt > 0:
-                scores['FIB-4'] = (age * ast) / (platelets * np.sqrt(alt))
+                scores['FIB-4'] = (age * ast) / (platelets * math.sqrt(alt))
             else:
                 scores['FIB-4'] = 0
             
@@ -211,9 +327,9 @@ class HCCRiskModelFinal:
             total_bil = max(features.get('Total_Bil', 1), 1)
             creatinine = max(features.get('Creatinine', 1), 1)
             
-            scores['MELD'] = (3.78 * np.log(total_bil) + 
-                             11.2 * np.log(inr) + 
-                             9.57 * np.log(creatinine) + 6.43)
+            scores['MELD'] = (3.78 * math.log(total_bil) + 
+                             11.2 * math.log(inr) + 
+                             9.57 * math.log(creatinine) + 6.43)
             
             # AFP Risk Assessment
             afp = features.get('AFP', 0)
@@ -225,7 +341,7 @@ class HCCRiskModelFinal:
                 scores['AFP Risk'] = 'High'
             
         except Exception as e:
-            print(f"Error calculating traditional scores: {e}")
+            logger.warning("Error calculating traditional scores: %s", e)
         
         return scores
     
@@ -233,37 +349,15 @@ class HCCRiskModelFinal:
                                 traditional_scores: Dict[str, float], 
                                 risk_probability: float) -> str:
         """Generate clinical interpretation"""
-        interpretation = []
-        
-        # Age factor
-        age = features.get('Age', 0)
-        if age > 60:
-            interpretation.append("Advanced age increases HCC risk.")
-        
-        # Gender factor
-        gender = features.get('Gender', 1)
-        if gender == 2:  # Male
-            interpretation.append("Male gender is associated with higher HCC risk.")
-        
-        # Liver enzyme assessment
-        ast = features.get('AST', 0)
-        alt = features.get('ALT', 0)
-        if ast > 80 or alt > 80:
-            interpretation.append("Significantly elevated liver enzymes suggest hepatocellular injury.")
-        
-        # Platelet assessment
-        platelets = features.get('Trombosit', 0)
-        if platelets < 150000:
-            interpretation.append("Thrombocytopenia may indicate advanced liver disease.")
+        # Single-threshold findings, in output order
+        values = dict(features, **{'Peak enzyme': max(features.get('AST', 0), features.get('ALT', 0))})
+        interpretation = [message for feature, default, compare, threshold, message in _FINDING_CHECKS
+                          if compare(values.get(feature, default), threshold)]
         
         # AFP assessment
-        afp = features.get('AFP', 0)
-        if afp > 400:
-            interpretation.append("Very high AFP strongly suggests HCC.")
-        elif afp > 200:
-            interpretation.append("Elevated AFP is concerning for HCC.")
-        elif afp > 20:
-            interpretation.append("Mildly elevated AFP warrants monitoring.")
+        afp_message = _AFP_MESSAGES[bisect.bisect_left(_AFP_THRESHOLDS, features.get('AFP', 0))]
+        if afp_message:
+            interpretation.append(afp_message)
         
         # Traditional score interpretation
         if 'FIB-4' in traditional_scores:
@@ -272,18 +366,32 @@ class HCCRiskModelFinal:
                 interpretation.append("High FIB-4 suggests advanced fibrosis.")
         
         # Risk-based recommendations
-        if risk_probability > 0.7:
-            interpretation.append("High risk warrants immediate hepatology evaluation and imaging.")
-        elif risk_probability > 0.3:
-            interpretation.append("Moderate risk requires close monitoring and follow-up.")
-        else:
-            interpretation.append("Low risk but continue surveillance if risk factors present.")
+        interpretation.append(_RISK_RECOMMENDATIONS[bisect.bisect_left(_RISK_THRESHOLDS, risk_probability)])
         
         return " ".join(interpretation)
 
 
+# Shared model instance, loaded once per process on first prediction
+_MODEL_SINGLETON = None
+_MODEL_LOCK = threading.Lock()
+
+
+def _get_model() -> HCCRiskModelFinal:
+    """Return the process-wide model, loading the pickles on first use"""
+    global _MODEL_SINGLETON
+    if _MODEL_SINGLETON is None:
+        with _MODEL_LOCK:
+            if _MODEL_SINGLETON is None:
+                _MODEL_SINGLETON = HCCRiskModelFinal()
+    return _MODEL_SINGLETON
+
+
 # Convenience function for easy import
 def predict_hcc_risk(patient_data: Dict[str, Any]) -> Dict[str, Any]:
     """Convenience function to predict HCC risk"""
-    model = HCCRiskModelFinal()
-    return model.predict_risk(patient_data)
+    return _get_model().predict_risk(patient_data)
+
+
+def predict_hcc_risk_batch(patients: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convenience function to predict HCC risk for a list of patients"""
+    return _get_model().predict_risk_batch(patients)
@@ -6,34 +6,79 @@ Input fields: age, gender, AST, ALT, trombosit, albumin, bmi, inr,
 """
 
 import numpy as np
-import pandas as pd
 from typing import Dict, Any, Tuple
-from catboost import CatBoostClassifier
-from sklearn.preprocessing import StandardScaler
-from sklearn.impute import KNNImputer
-import pickle
+import bisect
+import math
 import os
+import threading
 import joblib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Features expected by the CatBoost model (from training data)
+_FEATURE_NAMES = (
+    'Age', 'Gender (Female=1, Male=2)', 'AST', 'ALT', 'Trombosit', 'Albumin', 
+    'Body Mass Index', 'INR', 'Total Bilirubin', 'Creatinine', 'Direct Bilirubin', 'ALP'
+)
+
+# Map form field names to expected feature names: (form field, feature name)
+_FIELD_MAPPING = (
+    ('age', 'Age'),
+    ('gender', 'Gender (Female=1, Male=2)'),
+    ('ast', 'AST'),
+    ('alt', 'ALT'),
+    ('trombosit', 'Trombosit'),
+    ('albumin', 'Albumin'),
+    ('bmi', 'Body Mass Index'),
+    ('inr', 'INR'),
+    ('total_bilirubin', 'Total Bilirubin'),
+    ('creatinine', 'Creatinine'),
+    ('direct_bilirubin', 'Direct Bilirubin'),
+    ('alp', 'ALP'),
+)
+
+# Inputs read by the rule-based fallback, scores and interpretation: (form key, dataset key)
+_INPUT_KEYS = (
+    ('age', 'Age'),
+    ('bmi', 'BMI'),
+    ('ast', 'AST'),
+    ('alt', 'ALT'),
+    ('trombosit', 'Trombosit'),
+    ('albumin', 'Albumin'),
+    ('inr', 'INR'),
+)
+
+
+# Interpretation text keyed by "is NASH" (False = NAFL)
+_CLASSIFICATION_SUMMARIES = {
+    True: ("NASH (Non-Alcoholic Steatohepatitis) is characterized by liver inflammation and may progress to fibrosis.",
+           "This condition requires active monitoring and intervention."),
+    False: ("NAFL (Non-Alcoholic Fatty Liver) is simple steatosis without significant inflammation.",
+            "This is a milder form but still requires lifestyle modifications."),
+}
+_CLASSIFICATION_RECOMMENDATIONS = {
+    True: "NASH requires lifestyle intervention, regular monitoring, and possible medical treatment.",
+    False: "NAFL management focuses on lifestyle modifications and monitoring for progression.",
+}
+
+# BMI bands (value >= threshold) and the message for each
+_BMI_THRESHOLDS = (25, 30)
+_BMI_MESSAGES = (
+    None,
+    "Overweight status (BMI 25-29.9) is a moderate risk factor.",
+    "Obesity (BMI ≥30) significantly increases progression risk.",
+)
 
 
 class NAFLDRiskModel:
     def __init__(self):
         self.model_path = os.path.join(os.path.dirname(__file__), '..', 'models-temp', 'nafld', 'catboost_model.pkl')
-        self.scaler_path = os.path.join(os.path.dirname(__file__), 'nafld_scaler.pkl')
-        self.imputer_path = os.path.join(os.path.dirname(__file__), 'nafld_imputer.pkl')
         self.model = None
-        self.scaler = None
-        self.imputer = None
         
         # Features expected by the CatBoost model (from training data)
-        self.feature_names = [
-            'Age', 'Gender (Female=1, Male=2)', 'AST', 'ALT', 'Trombosit', 'Albumin', 
-            'Body Mass Index', 'INR', 'Total Bilirubin', 'Creatinine', 'Direct Bilirubin', 'ALP'
-        ]
-        
-        # Initialize preprocessing tools
-        self.scaler = StandardScaler()
-        self.imputer = KNNImputer(n_neighbors=5)
+        self.feature_names = list(_FEATURE_NAMES)
         
         self.load_model()
     
@@ -42,13 +87,13 @@ class NAFLDRiskModel:
         try:
             if os.path.exists(self.model_path):
                 self.model = joblib.load(self.model_path)
-                print("✅ NAFLD CatBoost model loaded successfully")
+                logger.info("NAFLD CatBoost model loaded successfully")
             else:
-                print("⚠️  NAFLD CatBoost model file not found, using rule-based calculations")
+                logger.warning("NAFLD CatBoost model file not found, using rule-based calculations")
                 self.model = None
                 
         except Exception as e:
-            print(f"❌ Error loading NAFLD CatBoost model: {e}")
+            logger.error("Error loading NAFLD CatBoost model: %s", e)
             self.model = None
     
     def predict_risk(self, patient_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -62,42 +107,25 @@ class NAFLDRiskModel:
             Dictionary with prediction results
         """
         try:
-            print("🔍 NAFLD Model - Raw patient data received:")
-            for key, value in patient_data.items():
-                print(f"  {key}: {value} (type: {type(value)})")
-            
-            # Map form field names to expected feature names
-            field_mapping = {
-                'age': 'Age',
-                'gender': 'Gender (Female=1, Male=2)',
-                'ast': 'AST',
-                'alt': 'ALT',
-                'trombosit': 'Trombosit',
-                'albumin': 'Albumin',
-                'bmi': 'Body Mass Index',
-                'inr': 'INR',
-                'total_bilirubin': 'Total Bilirubin',
-                'creatinine': 'Creatinine',
-                'direct_bilirubin': 'Direct Bilirubin',
-                'alp': 'ALP'
-            }
+            # Only format the raw and mapped dumps when someone is reading them
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug("NAFLD Model - Raw patient data received:\n%s", "\n".join(
+                    f"  {key}: {value} (type: {type(value)})" for key, value in patient_data.items()))
             
             # Map form fields to expected feature names
             mapped_data = {}
-            missing_fields = []
             
-            for form_field, feature_name in field_mapping.items():
+            for form_field, feature_name in _FIELD_MAPPING:
                 if form_field in patient_data:
                     mapped_data[feature_name] = patient_data[form_field]
             
-            print("📊 NAFLD Model - Mapped feature data:")
-            for feature_name in self.feature_names:
-                if feature_name in mapped_data:
-                    value = mapped_data[feature_name]
-                    print(f"  {feature_name}: {value}")
-                else:
-                    print(f"  {feature_name}: MISSING")
-                    missing_fields.append(feature_name)
+            missing_fields = [feature_name for feature_name in self.feature_names if feature_name not in mapped_data]
+            if debug:
+                logger.debug("NAFLD Model - Mapped feature data:\n%s", "\n".join(
+                    f"  {feature_name}: {mapped_data[feature_name]}" if feature_name in mapped_data
+                    else f"  {feature_name}: MISSING"
+                    for feature_name in self.feature_names))
             
             # Raise error if any required fields are missing
             if missing_fields:
@@ -109,26 +137,31 @@ class NAFLDRiskModel:
                 value = float(mapped_data[field])
                 features.append(value)
             
-            print(f"🔢 NAFLD Model - Final feature vector: {features}")
+            logger.debug("NAFLD Model - Final feature vector: %s", features)
+            
+            # CatBoost scores a raw row by position (same order as feature_names);
+            # a DataFrame would be converted to a Pool and re-checked on every call
+            X = np.asarray(features, dtype=np.float32).reshape(1, -1)
             
-            # Convert to DataFrame for consistent processing
-            X = pd.DataFrame([features], columns=self.feature_names)
+            # Numeric inputs for the rule-based fallback, scores and interpretation, converted once
+            values = self._normalize_inputs(patient_data)
             
             if self.model is not None:
-                print("🤖 NAFLD Model - Using trained CatBoost model")
+                logger.debug("NAFLD Model - Using trained CatBoost model")
                 # Use trained CatBoost model WITHOUT preprocessing
                 # CatBoost can handle raw features directly
                 
-                print(f"📊 NAFLD Model - Raw input data shape: {X.shape}")
-                print(f"📊 NAFLD Model - Raw input data: {X.iloc[0].tolist()}")
+                if debug:
+                    logger.debug("NAFLD Model - Raw input data shape: %s", X.shape)
+                    logger.debug("NAFLD Model - Raw input data: %s", X[0].tolist())
                 
                 # Make prediction directly on raw data
                 prediction = self.model.predict(X)[0]
                 probabilities = self.model.predict_proba(X)[0]
                 
-                print(f"🎯 NAFLD Model - Raw prediction: {prediction}")
-                print(f"🎯 NAFLD Model - Probabilities: {probabilities}")
-                print(f"🎯 NAFLD Model - Probabilities shape: {probabilities.shape}")
+                logger.debug("NAFLD Model - Raw prediction: %s", prediction)
+                logger.debug("NAFLD Model - Probabilities: %s", probabilities)
+                logger.debug("NAFLD Model - Probabilities shape: %s", probabilities.shape)
                 
                 # Determine classification
                 if prediction == 1:
@@ -143,22 +176,22 @@ class NAFLDRiskModel:
                     risk_color = "danger"
                     confidence = probabilities[1] * 100  # Probability for class 2 (NASH)
                 
-                print(f"✅ NAFLD Model - Final classification: {classification}")
-                print(f"✅ NAFLD Model - Final confidence: {confidence}%")
+                logger.debug("NAFLD Model - Final classification: %s", classification)
+                logger.debug("NAFLD Model - Final confidence: %s%%", confidence)
                 
                 model_type = 'CatBoost Trained Model'
             else:
-                print("🔄 NAFLD Model - Using rule-based fallback")
+                logger.debug("NAFLD Model - Using rule-based fallback")
                 # Fallback to rule-based prediction
-                classification, classification_description, risk_color, confidence = self._mock_classification(patient_data)
+                classification, classification_description, risk_color, confidence = self._mock_classification(values)
                 model_type = 'Rule-based Classification'
-                print(f"✅ NAFLD Model - Rule-based result: {classification} ({confidence}%)")
+                logger.debug("NAFLD Model - Rule-based result: %s (%s%%)", classification, confidence)
             
             # Calculate traditional scores
-            traditional_scores = self._calculate_traditional_scores(patient_data)
+            traditional_scores = self._calculate_traditional_scores(values)
             
             # Generate interpretation
-            interpretation = self._generate_interpretation(patient_data, traditional_scores, classification)
+            interpretation = self._generate_interpretation(values, traditional_scores, classification)
             
             return {
                 'disease': 'MAFLD Classification',
@@ -186,12 +219,20 @@ class NAFLDRiskModel:
                 'interpretation': f'Error in calculation: {str(e)}'
             }
     
-    def _mock_classification(self, patient_data: Dict[str, Any]) -> tuple:
+    @staticmethod
+    def _normalize_inputs(patient_data: Dict[str, Any]) -> Dict[str, float]:
+        """Read each input once as a float, accepting dataset-style (e.g. 'AST') or form-style ('ast') keys"""
+        return {
+            key: float(patient_data.get(dataset_key, patient_data.get(key, 0)))
+            for key, dataset_key in _INPUT_KEYS
+        }
+    
+    def _mock_classification(self, values: Dict[str, float]) -> tuple:
         """
         Mock classification for NAFL vs NASH when model is not available
         
         Args:
-            patient_data: Patient data dictionary
+            values: Normalized numeric inputs (see _normalize_inputs)
             
         Returns:
             Tuple with (classification, description, color, confidence)
@@ -200,14 +241,14 @@ class NAFLDRiskModel:
         score = 0.0
         
         # Age factor (higher age increases NASH risk)
-        age = float(patient_data.get('Age', patient_data.get('age', 0)))
+        age = values['age']
         if age > 50:
             score += 0.3
         elif age > 40:
             score += 0.2
         
         # BMI factor (higher BMI increases NASH risk)
-        bmi = float(patient_data.get('BMI', patient_data.get('bmi', 0)))
+        bmi = values['bmi']
         if bmi > 35:
             score += 0.4
         elif bmi > 30:
@@ -216,8 +257,8 @@ class NAFLDRiskModel:
             score += 0.2
         
         # Liver enzyme levels (higher levels suggest NASH)
-        ast = float(patient_data.get('AST', patient_data.get('ast', 0)))
-        alt = float(patient_data.get('ALT', patient_data.get('alt', 0)))
+        ast = values['ast']
+        alt = values['alt']
         if ast > 80 or alt > 80:
             score += 0.4
         elif ast > 40 or alt > 40:
@@ -234,21 +275,21 @@ class NAFLDRiskModel:
                 score += 0.2
         
         # Platelet count (lower platelets may indicate NASH)
-        platelets = float(patient_data.get('Trombosit', patient_data.get('trombosit', 0)))
+        platelets = values['trombosit']
         if platelets < 150:
             score += 0.2
         elif platelets < 100:
             score += 0.3
         
         # Albumin (low albumin may indicate NASH)
-        albumin = float(patient_data.get('Albumin', patient_data.get('albumin', 0)))
+        albumin = values['albumin']
         if albumin < 3.5:
             score += 0.2
         elif albumin < 4.0:
             score += 0.1
         
         # INR (elevated in advanced disease)
-        inr = float(patient_data.get('INR', patient_data.get('inr', 0)))
+        inr = values['inr']
         if inr > 1.3:
             score += 0.2
         elif inr > 1.1:
@@ -260,19 +301,19 @@ class NAFLDRiskModel:
         else:
             return "NAFL", "Non-Alcoholic Fatty Liver (Simple Steatosis)", "warning", min((1-score) * 100, 95.0)
     
-    def _calculate_traditional_scores(self, patient_data: Dict[str, Any]) -> Dict[str, float]:
+    def _calculate_traditional_scores(self, values: Dict[str, float]) -> Dict[str, float]:
         """Calculate traditional NAFLD scores"""
         scores = {}
         
         try:
             # NAFLD Fibrosis Score (NFS)
-            age = float(patient_data.get('Age', patient_data.get('age', 0)))
-            bmi = float(patient_data.get('BMI', patient_data.get('bmi', 0)))
+            age = values['age']
+            bmi = values['bmi']
             diabetes = 0  # Assuming no diabetes data, could be enhanced
-            ast = float(patient_data.get('AST', patient_data.get('ast', 0)))
-            alt = float(patient_data.get('ALT', patient_data.get('alt', 0)))
-            platelets = max(float(patient_data.get('Trombosit', patient_data.get('trombosit', 0))), 1)
-            albumin = float(patient_data.get('Albumin', patient_data.get('albumin', 0)))
+            ast = values['ast']
+            alt = values['alt']
+            platelets = max(values['trombosit'], 1)
+            albumin = values['albumin']
             
             # AST/ALT ratio
             ast_alt_ratio = ast / max(alt, 1)
@@ -283,9 +324,9 @@ class NAFLDRiskModel:
                    0.013 * platelets - 0.66 * albumin)
             scores['NFS'] = nfs
             
-            # FIB-4 Score (also applicable to NAFLD)
-            fib4 = (age * ast) / (platelets * np.sqrt(alt))
-            scores['FIB-4'] = fib4
+            # FIB-4 Score (also applicable to NAFLD); undefined without a positive ALT
+            if alt > 0:
+                scores['FIB-4'] = (age * ast) / (platelets * math.sqrt(alt))
             
             # APRI Score 
             apri = ((ast / 40) / platelets) * 100
@@ -304,35 +345,28 @@ class NAFLDRiskModel:
             scores['BMI_Category'] = bmi_category
             
         except Exception as e:
-            print(f"Error calculating traditional scores: {e}")
+            logger.warning("Error calculating traditional scores: %s", e)
         
         return scores
     
-    def _generate_interpretation(self, patient_data: Dict[str, Any], 
+    def _generate_interpretation(self, values: Dict[str, float], 
                                 traditional_scores: Dict[str, float], 
                                 classification: str) -> str:
         """Generate clinical interpretation for NAFL vs NASH classification"""
-        interpretation = []
+        is_nash = classification == "NASH"
         
         # Classification-based interpretation
-        if classification == "NASH":
-            interpretation.append("NASH (Non-Alcoholic Steatohepatitis) is characterized by liver inflammation and may progress to fibrosis.")
-            interpretation.append("This condition requires active monitoring and intervention.")
-        else:
-            interpretation.append("NAFL (Non-Alcoholic Fatty Liver) is simple steatosis without significant inflammation.")
-            interpretation.append("This is a milder form but still requires lifestyle modifications.")
+        interpretation = list(_CLASSIFICATION_SUMMARIES[is_nash])
         
         # BMI assessment
-        bmi = float(patient_data.get('BMI', patient_data.get('bmi', 0)))
-        if bmi >= 30:
-            interpretation.append("Obesity (BMI ≥30) significantly increases progression risk.")
-        elif bmi >= 25:
-            interpretation.append("Overweight status (BMI 25-29.9) is a moderate risk factor.")
+        bmi_message = _BMI_MESSAGES[bisect.bisect_right(_BMI_THRESHOLDS, values['bmi'])]
+        if bmi_message:
+            interpretation.append(bmi_message)
         
         # Liver enzyme assessment
-        ast = float(patient_data.get('AST', patient_data.get('ast', 0)))
-        alt = float(patient_data.get('ALT', patient_data.get('alt', 0)))
-        if ast > 40 or alt > 40:
+        ast = values['ast']
+        alt = values['alt']
+        if max(ast, alt) > 40:
             interpretation.append("Elevated liver enzymes suggest hepatic inflammation.")
         
         # AST/ALT ratio interpretation
@@ -359,10 +393,7 @@ class NAFLDRiskModel:
                 interpretation.append("FIB-4 >2.67 suggests high risk of advanced fibrosis.")
         
         # Classification-based recommendations
-        if classification == "NASH":
-            interpretation.append("NASH requires lifestyle intervention, regular monitoring, and possible medical treatment.")
-        else:
-            interpretation.append("NAFL management focuses on lifestyle modifications and monitoring for progression.")
+        interpretation.append(_CLASSIFICATION_RECOMMENDATIONS[is_nash])
         
         return " ".join(interpretation)
     
@@ -373,8 +404,22 @@ class NAFLDRiskModel:
         return {}
 
 
+# Shared model instance, loaded once per process on first prediction
+_MODEL_SINGLETON = None
+_MODEL_LOCK = threading.Lock()
+
+
+def _get_model() -> NAFLDRiskModel:
+    """Return the process-wide model, loading the pickles on first use"""
+    global _MODEL_SINGLETON
+    if _MODEL_SINGLETON is None:
+        with _MODEL_LOCK:
+            if _MODEL_SINGLETON is None:
+                _MODEL_SINGLETON = NAFLDRiskModel()
+    return _MODEL_SINGLETON
+
+
 # Convenience function for easy import
 def predict_nafld_classification(patient_data: Dict[str, Any]) -> Dict[str, Any]:
     """Convenience function to predict NAFLD classification (NAFL vs NASH)"""
-    model = NAFLDRiskModel()
-    return model.predict_risk(patient_data)
+    return _get_model().predict_risk(patient_data)